@@ -0,0 +1,41 @@
+import os
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+
+
+def temp_path(path):
+    """
+    Hidden sibling of `path` to write before renaming over it. The name carries
+    the process and thread, so concurrent writers never share a temp file.
+    """
+    path = Path(path)
+    return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+@contextmanager
+def atomic_open(path, mode='w', encoding='utf-8', fsync=False):
+    """
+    Open a temp sibling of `path` for writing and rename it over `path` when
+    the block exits cleanly, so readers never see a partial file and a crash
+    leaves the old one in place. On an error the temp file is removed.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = temp_path(path)
+    try:
+        with open(tmp_path, mode, encoding=None if 'b' in mode else encoding) as f:
+            yield f
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def write_atomic(path, data, fsync=False):
+    """Atomically replace `path` with `data` (str, written as UTF-8, or bytes)."""
+    with atomic_open(path, 'wb' if isinstance(data, bytes) else 'w', fsync=fsync) as f:
+        f.write(data)
@@ -0,0 +1,100 @@
+import json
+import hashlib
+import threading
+from pathlib import Path
+from logger import setup_logger
+from atomic_write import atomic_open
+
+# Initialize logger
+logger = setup_logger('Checkpoints', 'project_initializer.log')
+
+MANIFEST_NAME = '.checkpoints.json'
+
+
+def fingerprint(*parts):
+    """Stable SHA-256 over JSON-serializable stage inputs."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(json.dumps(part, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CheckpointStore:
+    """
+    Per-project manifest of validated artifacts.
+
+    For every completed stage the manifest records the artifact file name,
+    the SHA-256 of the bytes written and a fingerprint of everything the
+    stage consumed (subject and upstream artifacts). A stage can be
+    skipped on resume only if both still match, so editing the subject or
+    an upstream artifact invalidates everything downstream of it.
+    """
+
+    def __init__(self, folder):
+        self.folder = Path(folder)
+        self.path = self.folder / MANIFEST_NAME
+        self._lock = threading.Lock()
+
+    def _read(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError as e:
+            logger.warning(f"Ignoring unreadable checkpoint manifest {self.path}: {e}")
+            return {}
+
+    def _write(self, manifest):
+        with atomic_open(self.path) as f:
+            json.dump(manifest, f, indent=4)
+
+    def load(self, stage, inputs_fingerprint):
+        """Return the checkpointed artifact for `stage`, or None if it must be regenerated."""
+        with self._lock:
+            entry = self._read().get(stage)
+        if not entry:
+            return None
+        if entry.get('inputs') != inputs_fingerprint:
+            logger.info(f"Checkpoint for {stage} is stale: inputs changed")
+            return None
+        artifact_path = self.folder / entry['artifact']
+        try:
+            if file_digest(artifact_path) != entry.get('sha256'):
+                logger.info(f"Checkpoint for {stage} is stale: {artifact_path} was modified")
+                return None
+            with open(artifact_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.info(f"Checkpoint for {stage} is unusable: {e}")
+            return None
+        logger.info(f"Resuming from checkpoint: {artifact_path}")
+        return data
+
+    def record(self, stage, artifact_name, inputs_fingerprint):
+        """Record that `artifact_name` was validated and saved for the given inputs."""
+        artifact_path = self.folder / artifact_name
+        with self._lock:
+            manifest = self._read()
+            manifest[stage] = {
+                "artifact": artifact_name,
+                "sha256": file_digest(artifact_path),
+                "inputs": inputs_fingerprint
+            }
+            self._write(manifest)
+        logger.debug(f"Checkpoint recorded for {stage}")
+
+    def invalidate(self, stage):
+        with self._lock:
+            manifest = self._read()
+            if manifest.pop(stage, None) is not None:
+                self._write(manifest)
@@ -0,0 +1,303 @@
+import re
+import json
+
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?\Z")
+_BARE_WORD = re.compile(r"[A-Za-z0-9_$+\-.]+")
+_PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_JSON_LITERALS = ("true", "false", "null")
+_ESCAPES = '"\\/bfnrtu'
+_VALUE_START = re.compile(r"[{\[]")
+MAX_START_ATTEMPTS = 5
+
+
+class JSONRepairError(ValueError):
+    """The text does not contain a JSON document that can be repaired locally."""
+
+
+class _Repairer:
+    """
+    Single pass over model output that re-emits the outermost JSON value,
+    fixing defects as it goes. Frames on the stack are dicts with the
+    container kind, the parser state and where the pending key started.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.out = []
+        self.stack = []
+        self.fixes = {}
+        self.done = False
+        self.end = 0
+
+    def fix(self, description):
+        self.fixes[description] = self.fixes.get(description, 0) + 1
+
+    # Output helpers
+
+    def _state(self):
+        return self.stack[-1]["state"] if self.stack else "value"
+
+    def _set_state(self, state):
+        if self.stack:
+            self.stack[-1]["state"] = state
+
+    def _value_done(self):
+        if self.stack:
+            self._set_state("comma_or_end")
+        else:
+            self.done = True
+
+    def _before_value(self):
+        """Called when a value starts; returns False if it cannot go here."""
+        state = self._state()
+        if state == "comma_or_end":
+            self.out.append(",")
+            self.fix("inserted missing comma")
+            state = "key" if self.stack[-1]["kind"] == "object" else "value"
+            self._set_state(state)
+        if state in ("key", "key_or_end"):
+            return False
+        if state == "colon":
+            self.out.append(":")
+            self.fix("inserted missing colon")
+        return True
+
+    def _drop_trailing_comma(self):
+        if self.out and self.out[-1] == ",":
+            self.out.pop()
+            self.fix("removed trailing comma")
+
+    def _drop_pending_key(self):
+        frame = self.stack[-1]
+        if frame["kind"] == "object" and frame["state"] in ("colon", "value"):
+            del self.out[frame["key_start"]:]
+            self.fix("removed key without a value")
+            frame["state"] = "comma_or_end" if len(self.out) > frame["start"] + 1 else "key_or_end"
+        self._drop_trailing_comma()
+
+    def _close(self):
+        frame = self.stack[-1]
+        self._drop_pending_key()
+        self.out.append("}" if frame["kind"] == "object" else "]")
+        self.stack.pop()
+        self._value_done()
+
+    # Tokens
+
+    def _string(self, i):
+        """Read a string starting at text[i] (either quote style). Returns (end index, JSON text, complete)."""
+        text = self.text
+        quote = text[i]
+        if quote == "'":
+            self.fix("converted single-quoted strings")
+        pieces = ['"']
+        i += 1
+        n = len(text)
+        while i < n:
+            c = text[i]
+            if c == "\\":
+                if i + 1 >= n:
+                    break
+                following = text[i + 1]
+                if following == "'" and quote == "'":
+                    pieces.append("'")
+                elif following in _ESCAPES:
+                    pieces.append(c + following)
+                else:
+                    pieces.append("\\\\" + following)
+                    self.fix("escaped stray backslash")
+                i += 2
+                continue
+            if c == quote:
+                pieces.append('"')
+                return i + 1, "".join(pieces), True
+            if c == '"':
+                pieces.append('\\"')
+            elif c < " ":
+                pieces.append(json.dumps(c)[1:-1])
+                self.fix("escaped control character in string")
+            else:
+                pieces.append(c)
+            i += 1
+        pieces.append('"')
+        return n, "".join(pieces), False
+
+    def _word(self, i):
+        match = _BARE_WORD.match(self.text, i)
+        return match.end(), match.group()
+
+    def run(self, i):
+        text = self.text
+        if text[:i].strip():
+            self.fix("dropped leading text")
+        n = len(text)
+
+        while i < n and not self.done:
+            c = text[i]
+            if c in " \t\r\n":
+                i += 1
+                continue
+            if c == "/" and text.startswith(("//", "/*"), i):
+                end = text.find("\n", i) if text[i + 1] == "/" else text.find("*/", i + 2)
+                i = n if end < 0 else end + (0 if text[i + 1] == "/" else 2)
+                self.fix("removed comment")
+                continue
+
+            state = self._state()
+            frame = self.stack[-1] if self.stack else None
+
+            if c in "}]":
+                wanted = "object" if c == "}" else "array"
+                if not any(f["kind"] == wanted for f in self.stack):
+                    self.fix("dropped unmatched bracket")
+                    i += 1
+                    continue
+                while self.stack[-1]["kind"] != wanted:
+                    self._close()
+                    self.fix("closed unbalanced bracket")
+                self._close()
+                i += 1
+                continue
+
+            if c == ",":
+                if state == "comma_or_end":
+                    self.out.append(",")
+                    self._set_state("key" if frame["kind"] == "object" else "value")
+                else:
+                    self.fix("removed extra comma")
+                i += 1
+                continue
+
+            if c == ":":
+                if state == "colon":
+                    self.out.append(":")
+                    self._set_state("value")
+                else:
+                    self.fix("dropped stray colon")
+                i += 1
+                continue
+
+            if state == "comma_or_end" and frame["kind"] == "object" and (c in "\"'" or _BARE_WORD.match(c)):
+                self.out.append(",")
+                self.fix("inserted missing comma")
+                state = frame["state"] = "key"
+
+            # Object keys: quoted, single-quoted or bare
+            if state in ("key", "key_or_end"):
+                key_start = len(self.out)
+                if c in "\"'":
+                    i, string, complete = self._string(i)
+                    if not complete:
+                        break
+                elif _BARE_WORD.match(c):
+                    i, word = self._word(i)
+                    string = json.dumps(word)
+                    self.fix("quoted bare key")
+                else:
+                    raise JSONRepairError(f"unexpected {c!r} where an object key belongs (offset {i})")
+                frame["key_start"] = key_start
+                self.out.append(string)
+                frame["state"] = "colon"
+                continue
+
+            if c in "{[":
+                if not self._before_value():
+                    raise JSONRepairError(f"value where an object key belongs (offset {i})")
+                kind = "object" if c == "{" else "array"
+                self.stack.append({"kind": kind, "state": "key_or_end" if kind == "object" else "value_or_end",
+                                   "start": len(self.out), "key_start": None})
+                self.out.append(c)
+                i += 1
+                continue
+
+            if c in "\"'":
+                if not self._before_value():
+                    raise JSONRepairError(f"string where an object key belongs (offset {i})")
+                i, string, complete = self._string(i)
+                if not complete:
+                    # A partial value (half a file name) is worse than none: drop it along with its key
+                    self.fix("dropped truncated string")
+                    if self.stack and self.stack[-1]["kind"] == "object":
+                        self._set_state("value")
+                    break
+                self.out.append(string)
+                self._value_done()
+                continue
+
+            if _BARE_WORD.match(c):
+                if not self._before_value():
+                    raise JSONRepairError(f"value where an object key belongs (offset {i})")
+                i, word = self._word(i)
+                if word in _JSON_LITERALS or _NUMBER.match(word):
+                    self.out.append(word)
+                elif word in _PYTHON_LITERALS:
+                    self.out.append(_PYTHON_LITERALS[word])
+                    self.fix("converted Python literal")
+                elif i >= n:
+                    # A literal cut off by the token limit
+                    self.fix("dropped truncated literal")
+                    if self.stack and self.stack[-1]["kind"] == "object":
+                        self._set_state("value")
+                    break
+                else:
+                    raise JSONRepairError(f"unexpected bare word {word[:20]!r} (offset {i - len(word)})")
+                self._value_done()
+                continue
+
+            self.fix("dropped stray character")
+            i += 1
+
+        if self.stack:
+            self.fix("completed truncated document")
+            while self.stack:
+                self._close()
+        elif not self.out:
+            raise JSONRepairError("no JSON value found")
+        self.end = i
+        if i < n and text[i:].strip().strip("`").strip():
+            self.fix("dropped trailing text")
+        return "".join(self.out)
+
+
+def repair_json(text):
+    """
+    Find the outermost JSON object or array in `text` and repair common
+    model-output defects: leading/trailing prose, trailing and missing
+    commas, comments, single quotes, bare keys, Python literals,
+    raw control characters in strings, and a tail truncated by max_tokens
+    (the dangling element is dropped and open containers are closed).
+
+    Prose around the document may itself contain brackets ("see [1]"), so
+    several opening brackets are tried and the candidate that consumes the
+    most input wins.
+
+    Returns (json_text, fixes) where fixes maps each repair to its count.
+    Raises JSONRepairError if the result still does not parse.
+    """
+    starts = [match.start() for match in _VALUE_START.finditer(text, 0)][:MAX_START_ATTEMPTS]
+    if not starts:
+        raise JSONRepairError("no JSON object or array found")
+    error = None
+    best = None             # (input consumed, repaired text, fixes)
+    best_end = -1
+    for start in starts:
+        # A bracket inside the best candidate so far only starts a part of it
+        if start < best_end:
+            continue
+        repairer = _Repairer(text)
+        try:
+            repaired = repairer.run(start)
+            json.loads(repaired)
+        except ValueError as e:
+            error = error or e
+            continue
+        if best is None or repairer.end - start > best[0]:
+            best = (repairer.end - start, repaired, repairer.fixes)
+            best_end = repairer.end
+    if best is None:
+        raise JSONRepairError(f"could not repair JSON: {error}") from error
+    return best[1], best[2]
+
+
+def describe_fixes(fixes):
+    return ", ".join(f"{name} x{count}" if count > 1 else name for name, count in fixes.items())
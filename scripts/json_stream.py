@@ -0,0 +1,265 @@
+import re
+import json
+from schema_registry import unwrap_schema
+
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?\Z")
+_LITERALS = {"true": "boolean", "false": "boolean", "null": "null"}
+_ESCAPES = frozenset('"\\/bfnrtu')
+_HEX = frozenset("0123456789abcdefABCDEF")
+_WHITESPACE = frozenset(" \t\r\n")
+
+# Keywords whose meaning this checker does not model; below them nothing is checked
+_UNMODELLED = ("$ref", "anyOf", "oneOf", "allOf", "not", "if", "patternProperties", "prefixItems", "dependentSchemas")
+
+# Preamble a model may put before the JSON document (a ```json fence)
+_PREAMBLE = re.compile(r"[\s`]*(?:json)?[\s`]*\Z", re.IGNORECASE)
+
+
+class StreamAbort(ValueError):
+    """The partial completion can no longer become a valid document."""
+
+    def __init__(self, reason, position):
+        super().__init__(f"{reason} (at character {position})")
+        self.reason = reason
+        self.position = position
+
+
+def _modelled(schema):
+    """`schema` if every keyword that matters here is understood, else None (unchecked)."""
+    if not isinstance(schema, dict) or any(keyword in schema for keyword in _UNMODELLED):
+        return None
+    return schema
+
+
+def _allows(schema, json_type):
+    if schema is None or "type" not in schema:
+        return True
+    allowed = schema["type"]
+    if isinstance(allowed, str):
+        allowed = (allowed,)
+    return json_type in allowed or (json_type == "integer" and "number" in allowed)
+
+
+def _property_schema(schema, key):
+    """Schema for `key` inside an object described by `schema`; False if the key is not allowed."""
+    if schema is None:
+        return None
+    properties = schema.get("properties", {})
+    if key in properties:
+        return _modelled(properties[key])
+    additional = schema.get("additionalProperties", True)
+    if additional is False:
+        return False
+    return _modelled(additional) if isinstance(additional, dict) else None
+
+
+class JSONStreamValidator:
+    """
+    Incremental JSON syntax and schema checker for a streamed completion.
+
+    feed() accepts the completion a chunk at a time and raises StreamAbort
+    as soon as the text seen so far cannot be the prefix of a document that
+    json.loads accepts and the schema allows: a trailing comma, a missing
+    colon, an unexpected key under additionalProperties: false, a value of
+    the wrong type, a string outside its enum, or an object closed without
+    a required key. A leading ```json fence is skipped, and anything after
+    the top-level value is ignored, matching extract_json.
+    """
+
+    def __init__(self, schema=None):
+        self.schema = _modelled(unwrap_schema(schema)) if schema else None
+        self.position = 0
+        self.preamble = []
+        self.started = False
+        self.checking = True
+        self.done = False
+        # Frames are [container, schema, state, keys seen, current key]
+        self.stack = []
+        self.state = "value"
+        self.value_schema = self.schema
+        self.in_string = False
+        self.escape = False
+        self.hex_digits = 0
+        self.string_chars = []
+        self.literal = None
+
+    def _abort(self, reason):
+        raise StreamAbort(reason, self.position)
+
+    def feed(self, text):
+        if self.done or not self.checking:
+            return
+        for char in text:
+            self._char(char)
+            self.position += 1
+            if self.done or not self.checking:
+                return
+
+    def finish(self):
+        """Call once the stream ends; a document that never closed is incomplete."""
+        if not self.checking or self.done:
+            return
+        if self.literal is not None and not self.stack:
+            self._end_literal()
+            return
+        self._abort("completion ended before the JSON document was complete")
+
+    # Values
+
+    def _begin_value(self, json_type):
+        if not _allows(self.value_schema, json_type):
+            self._abort(f"{self._path()} is {json_type}, schema expects {self.value_schema['type']}")
+
+    def _end_value(self):
+        if not self.stack:
+            self.done = True
+            return
+        self.stack[-1][2] = "comma_or_end"
+
+    def _end_literal(self):
+        token = "".join(self.literal)
+        self.literal = None
+        if token in _LITERALS:
+            self._begin_value(_LITERALS[token])
+        elif _NUMBER.match(token):
+            self._begin_value("number" if any(c in token for c in ".eE") else "integer")
+        else:
+            self._abort(f"invalid literal {token[:20]!r}")
+        self._end_value()
+
+    def _end_string(self):
+        text = "".join(self.string_chars)
+        self.string_chars = []
+        if "\\" in text:
+            # The body holds the escapes as written; keys and enums compare decoded text
+            text = json.loads('"' + text + '"')
+        frame = self.stack[-1] if self.stack else None
+        if frame is not None and frame[2] == "key":
+            frame[3].add(text)
+            frame[4] = text
+            if _property_schema(frame[1], text) is False:
+                self._abort(f"unexpected key {text!r} in {self._path(self.stack[:-1])}")
+            frame[2] = "colon"
+            return
+        enum = self.value_schema.get("enum") if self.value_schema else None
+        if enum is not None and text not in enum:
+            self._abort(f"{self._path()} value {text[:40]!r} is not one of {enum}")
+        self._end_value()
+
+    def _path(self, frames=None):
+        parts = []
+        for frame in self.stack if frames is None else frames:
+            if frame[0] == "object" and frame[4] is not None:
+                parts.append(frame[4])
+            elif frame[0] == "array":
+                parts.append("[]")
+        return "/".join(parts) or "<root>"
+
+    # Characters
+
+    def _char(self, char):
+        if self.in_string:
+            if self.hex_digits:
+                if char not in _HEX:
+                    self._abort("invalid \\u escape")
+                self.hex_digits -= 1
+            elif self.escape:
+                if char not in _ESCAPES:
+                    self._abort(f"invalid escape \\{char}")
+                self.escape = False
+                if char == "u":
+                    self.hex_digits = 4
+            elif char == "\\":
+                self.escape = True
+            elif char == '"':
+                self.in_string = False
+                return self._end_string()
+            elif char < " ":
+                self._abort("unescaped control character in string")
+            self.string_chars.append(char)
+            return
+
+        if self.literal is not None:
+            if char in _WHITESPACE or char in ",]}":
+                self._end_literal()
+                if self.done:
+                    return
+            else:
+                self.literal.append(char)
+                return
+
+        if not self.started:
+            if char in "{[":
+                if not _PREAMBLE.match("".join(self.preamble)):
+                    # Prose before the document: leave it to extract_json
+                    self.checking = False
+                    return
+                self.started = True
+            else:
+                self.preamble.append(char)
+                return
+
+        if char in _WHITESPACE:
+            return
+
+        frame = self.stack[-1] if self.stack else None
+        state = frame[2] if frame is not None else self.state
+
+        if state == "colon":
+            if char != ":":
+                self._abort(f"expected ':' after key {frame[4]!r}")
+            frame[2] = "value"
+            self.value_schema = _property_schema(frame[1], frame[4]) or None
+            return
+
+        if state == "comma_or_end":
+            if char == ",":
+                frame[2] = "key" if frame[0] == "object" else "value"
+                if frame[0] == "array":
+                    self.value_schema = _modelled(frame[1].get("items")) if frame[1] else None
+                return
+            return self._close(frame, char)
+
+        if state == "key" or state == "key_or_end":
+            if char == "}" and state == "key_or_end":
+                return self._close(frame, char)
+            if char != '"':
+                self._abort("trailing comma before '}'" if char == "}" else "expected a quoted key")
+            frame[2] = "key"
+            self.in_string = True
+            return
+
+        # state is "value" or "value_or_end"
+        if char == "]" and state == "value_or_end":
+            return self._close(frame, char)
+        if char in "]}":
+            self._abort(f"trailing comma before {char!r}" if frame is not None else f"unexpected {char!r}")
+        if char == "{":
+            self._begin_value("object")
+            self.stack.append(["object", self.value_schema, "key_or_end", set(), None])
+        elif char == "[":
+            self._begin_value("array")
+            items = _modelled(self.value_schema.get("items")) if self.value_schema else None
+            self.stack.append(["array", self.value_schema, "value_or_end", None, None])
+            self.value_schema = items
+        elif char == '"':
+            self._begin_value("string")
+            self.in_string = True
+        elif char == "-" or char.isdigit() or char in "tfn":
+            self.literal = [char]
+        else:
+            self._abort(f"unexpected character {char!r}")
+
+    def _close(self, frame, char):
+        expected = "}" if frame[0] == "object" else "]"
+        if char != expected:
+            self._abort(f"expected ',' or {expected!r}, got {char!r}")
+        if frame[0] == "object" and frame[1] is not None:
+            missing = [key for key in frame[1].get("required", []) if key not in frame[3]]
+            if missing:
+                self._abort(f"{self._path(self.stack[:-1])} closed without required {missing}")
+        self.stack.pop()
+        if self.stack and self.stack[-1][0] == "array":
+            parent = self.stack[-1]
+            self.value_schema = _modelled(parent[1].get("items")) if parent[1] else None
+        self._end_value()
@@ -0,0 +1,203 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from logger import setup_logger
+from atomic_write import write_atomic
+
+# Initialize logger
+logger = setup_logger('LLMCache', 'project_initializer.log')
+
+DEFAULT_CACHE_DIR = '.llm_cache'
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+# Eviction frees space down to this share of max_bytes, so a full cache is not rescanned on every put
+EVICT_TO = 0.9
+
+
+class CacheMissError(LookupError):
+    """Raised in replay mode when a request has no recorded response."""
+
+
+def request_key(request):
+    """
+    Content address of a chat completion request.
+    Every parameter that can change the completion is part of the hash
+    (model, messages, temperature, max_tokens, response_format, ...).
+    """
+    canonical = json.dumps(request, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    On-disk, content-addressed cache of raw completion text.
+
+    Entries live in <cache_dir>/<aa>/<key>.json. A hit refreshes the entry's
+    mtime, and when the directory grows past `max_bytes` the least recently
+    used entries are evicted. The directory is scanned once to size it; after
+    that a running total is kept and it is rescanned only when the total
+    exceeds the budget; eviction then frees space down to EVICT_TO of it. With `replay=True` the cache never lets a
+    request through: a miss raises CacheMissError, which makes reruns fully
+    deterministic and offline.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, enabled=True, replay=False):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.enabled = enabled or replay
+        self.replay = replay
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._size = None  # Bytes on disk, None until the first scan
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, request):
+        """Return the cached completion text for `request`, or None on a miss."""
+        if not self.enabled:
+            return None
+        key = request_key(request)
+        self._local.last_key = key
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                content = json.load(f)['content']
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.misses += 1
+            if self.replay:
+                raise CacheMissError(f"No recorded response for request {key[:12]} (replay mode)")
+            logger.debug(f"Cache miss for {key[:12]}")
+            return None
+        try:
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        logger.info(f"Cache hit for {key[:12]}")
+        return content
+
+    def put(self, request, content):
+        """Store the completion text for `request`, evicting old entries if over budget."""
+        if not self.enabled or self.replay:
+            return
+        key = request_key(request)
+        self._local.last_key = key
+        path = self._path(key)
+        entry = {"key": key, "model": request.get('model'), "created": time.time(), "content": content}
+        data = json.dumps(entry, ensure_ascii=False).encode('utf-8')
+        replaced = self._entry_size(path)
+        write_atomic(path, data)
+        with self._lock:
+            self.stores += 1
+            if self._size is not None:
+                self._size += len(data) - replaced
+            self._evict()
+        logger.debug(f"Cached response {key[:12]}")
+
+    def discard_last(self):
+        """
+        Drop the entry most recently read or written on this thread.
+        Used when a cached response turns out to fail validation, so the
+        next run asks the model again instead of replaying a bad answer.
+        """
+        key = getattr(self._local, 'last_key', None)
+        if not key or not self.enabled or self.replay:
+            return
+        path = self._path(key)
+        size = self._entry_size(path)
+        try:
+            path.unlink()
+            logger.info(f"Discarded cached response {key[:12]}")
+        except FileNotFoundError:
+            size = 0
+        with self._lock:
+            if self._size is not None:
+                self._size -= size
+        self._local.last_key = None
+
+    def forget_last(self):
+        """
+        Forget the entry this thread last read or wrote, so a later
+        discard_last() cannot reach a request made for an earlier stage.
+        """
+        self._local.last_key = None
+
+    @staticmethod
+    def _entry_size(path):
+        try:
+            return path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def _evict(self):
+        """
+        Remove least recently used entries once the cache exceeds max_bytes,
+        down to EVICT_TO of it. Called with the lock held; the directory is
+        only scanned when the running total is unknown or over budget.
+        """
+        if not self.max_bytes:
+            return
+        if self._size is not None and self._size <= self.max_bytes:
+            return
+        entries = []
+        total = 0
+        for path in self.cache_dir.glob('*/*.json'):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        self._size = total
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        target = self.max_bytes * EVICT_TO
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            total -= size
+            self.evictions += 1
+        self._size = total
+        logger.info(f"Evicted LRU cache entries, cache size now {total} bytes")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+
+def add_cache_arguments(parser):
+    """Register the shared --no-cache/--replay/--cache-dir/--cache-max-mb options."""
+    parser.add_argument('--no-cache', action='store_true', help="Always call the API; do not read or write the response cache")
+    parser.add_argument('--replay', action='store_true', help="Serve every request from the cache and fail on a miss")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="Response cache directory")
+    parser.add_argument('--cache-max-mb', type=float, default=DEFAULT_MAX_BYTES / (1024 * 1024),
+                        help="Evict least recently used responses beyond this size")
+
+
+def cache_from_args(args):
+    return ResponseCache(
+        cache_dir=args.cache_dir,
+        max_bytes=int(args.cache_max_mb * 1024 * 1024),
+        enabled=not args.no_cache,
+        replay=args.replay
+    )
@@ -0,0 +1,295 @@
+import os
+import time
+import random
+import threading
+from logger import setup_logger
+from prompt_builder import count_tokens
+
+# Initialize logger
+logger = setup_logger('LLMClient', 'project_initializer.log')
+
+DEFAULT_REQUESTS_PER_MINUTE = 500
+DEFAULT_TOKENS_PER_MINUTE = 200000
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_MAX_RETRIES = 5
+
+# Status codes worth retrying: timeouts, conflicts, rate limits and server errors
+RETRY_STATUSES = frozenset((408, 409, 429, 500, 502, 503, 504))
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `per_minute` units per minute."""
+
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1):
+        """Block until `amount` units are available and take them. Returns the seconds waited."""
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.level >= amount:
+                    self.level -= amount
+                    return waited
+                delay = (amount - self.level) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def refund(self, amount):
+        """
+        Return units reserved by an estimate that turned out too high. A
+        negative amount charges an overrun, which later acquires wait off.
+        """
+        with self._lock:
+            self._refill()
+            self.level = min(self.capacity, self.level + amount)
+
+
+def retry_after(error):
+    """Seconds the server asked us to wait (retry-after-ms / retry-after headers), or None."""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        if 'retry-after-ms' in headers:
+            return float(headers['retry-after-ms']) / 1000
+        if 'retry-after' in headers:
+            return float(headers['retry-after'])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def is_retryable(error):
+    if getattr(error, 'status_code', None) in RETRY_STATUSES:
+        return True
+    try:
+        from openai import APIConnectionError
+    except ImportError:
+        return False
+    # Includes APITimeoutError
+    return isinstance(error, APIConnectionError)
+
+
+def prompt_tokens(request):
+    return sum(count_tokens(str(message.get('content', ''))) for message in request.get('messages', []))
+
+
+def estimate_tokens(request):
+    """Upper bound on the tokens a request can consume: its prompt plus the completion limit."""
+    completion = request.get('max_completion_tokens') or request.get('max_tokens') or 0
+    return prompt_tokens(request) + completion
+
+
+def _total_tokens(usage):
+    total = getattr(usage, 'total_tokens', None)
+    return total if isinstance(total, int) else None
+
+
+class _GuardedStream:
+    """
+    Holds a concurrency slot until the wrapped stream is exhausted or closed.
+    On close, `settle` is called once with the tokens the stream used: the
+    reported usage (sent as the last chunk with include_usage), or for a
+    stream cut short before it, the prompt plus the text streamed so far.
+    """
+
+    def __init__(self, stream, release, settle, prompt):
+        self._stream = stream
+        self._release = release
+        self._settle = settle
+        self._prompt = prompt
+        self._usage = None
+        self._pieces = []
+
+    def __iter__(self):
+        try:
+            for chunk in self._stream:
+                self._usage = getattr(chunk, 'usage', None) or self._usage
+                for choice in getattr(chunk, 'choices', None) or ():
+                    content = getattr(getattr(choice, 'delta', None), 'content', None)
+                    if content:
+                        self._pieces.append(content)
+                yield chunk
+        finally:
+            self.close()
+
+    def close(self):
+        release, self._release = self._release, None
+        if release is not None:
+            close = getattr(self._stream, 'close', None)
+            if close is not None:
+                close()
+            release()
+            used = _total_tokens(self._usage)
+            if used is None:
+                used = self._prompt + count_tokens("".join(self._pieces))
+            self._settle(used)
+
+
+class LLMClient:
+    """
+    One OpenAI client per process, shared by every generator.
+
+    Requests go through a single connection-pooled HTTP session and are
+    paced by two token buckets (requests/min and tokens/min). Tokens are
+    reserved once per call from an upper-bound estimate, held across its
+    retries, and reconciled against reported usage when the response (or,
+    for a stream, its last chunk) arrives; a call that finally fails is
+    refunded in full. At most `max_concurrency` requests are in flight.
+    Rate limits, timeouts, connection errors and 5xx responses are retried
+    with full-jitter exponential backoff; a retry-after header from the
+    server takes precedence and holds back every thread, not just the one
+    that got it.
+    """
+
+    def __init__(self, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY, max_retries=DEFAULT_MAX_RETRIES,
+                 base_delay=1.0, max_delay=60.0, openai_client=None):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._openai = openai_client
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._resume_at = 0.0
+        self._local = threading.local()
+        self.stats = {"requests": 0, "retries": 0, "throttled_seconds": 0.0}
+
+    def connect(self):
+        """Create the underlying OpenAI client (fails fast when no API key is configured)."""
+        if self._openai is None:
+            with self._lock:
+                if self._openai is None:
+                    if not os.environ.get("OPENAI_API_KEY"):
+                        logger.critical("OPENAI_API_KEY environment variable not set.")
+                        raise RuntimeError("Please set the OPENAI_API_KEY environment variable.")
+                    import httpx
+                    from openai import OpenAI, DefaultHttpxClient
+                    limits = httpx.Limits(max_connections=self.max_concurrency,
+                                          max_keepalive_connections=self.max_concurrency)
+                    # Retries are handled here, where they can see the rate limiter
+                    self._openai = OpenAI(max_retries=0, http_client=DefaultHttpxClient(limits=limits))
+        return self._openai
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def _wait_for_server(self):
+        delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            self._count("throttled_seconds", delay)
+            time.sleep(delay)
+
+    def _backoff(self, attempt, error):
+        delay = retry_after(error)
+        if delay is not None:
+            with self._lock:
+                self._resume_at = max(self._resume_at, time.monotonic() + delay)
+        else:
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        logger.warning(f"LLM request failed ({error}); retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+        self._count("retries")
+        time.sleep(delay)
+
+    def create(self, **request):
+        """chat.completions.create with pacing, a concurrency cap and retries. Streams keep their slot until closed."""
+        client = self.connect()
+        prompt = prompt_tokens(request)
+        # acquire() never takes more than the bucket holds, so neither does the reservation
+        estimate = min(estimate_tokens(request), self.tokens.capacity)
+        reserved = False
+        attempt = 0
+        self._local.retries = 0
+        while True:
+            self._wait_for_server()
+            throttled = self.requests.acquire()
+            if not reserved:
+                # Retries reuse this reservation: a rejected attempt consumed no tokens
+                throttled += self.tokens.acquire(estimate)
+                reserved = True
+            if throttled:
+                self._count("throttled_seconds", throttled)
+            self._slots.acquire()
+            try:
+                self._count("requests")
+                response = client.chat.completions.create(**request)
+            except Exception as e:
+                self._slots.release()
+                if attempt >= self.max_retries or not is_retryable(e):
+                    self.tokens.refund(estimate)
+                    raise
+                self._backoff(attempt, e)
+                attempt += 1
+                self._local.retries = attempt
+                continue
+            if request.get('stream'):
+                return _GuardedStream(response, self._slots.release, lambda used: self._settle(estimate, used), prompt)
+            self._slots.release()
+            used = _total_tokens(getattr(response, 'usage', None))
+            if used is not None:
+                self._settle(estimate, used)
+            return response
+
+    def _settle(self, estimate, used):
+        """Reconcile a reservation of `estimate` tokens with the `used` tokens reported for it."""
+        if used != estimate:
+            self.tokens.refund(estimate - min(used, self.tokens.capacity))
+
+    def last_retries(self):
+        """Retries needed by the most recent create() on the calling thread."""
+        return getattr(self._local, 'retries', 0)
+
+
+_shared_client = None
+_shared_lock = threading.Lock()
+
+
+def shared_client():
+    """The process-wide LLMClient, created with default limits on first use."""
+    global _shared_client
+    if _shared_client is None:
+        with _shared_lock:
+            if _shared_client is None:
+                _shared_client = LLMClient()
+    return _shared_client
+
+
+def add_client_arguments(parser):
+    group = parser.add_argument_group('LLM client')
+    group.add_argument('--rpm', type=int, default=DEFAULT_REQUESTS_PER_MINUTE,
+                       help="Requests per minute allowed by the rate limiter")
+    group.add_argument('--tpm', type=int, default=DEFAULT_TOKENS_PER_MINUTE,
+                       help="Tokens per minute allowed by the rate limiter")
+    group.add_argument('--max-concurrency', type=int, default=DEFAULT_MAX_CONCURRENCY,
+                       help="Maximum LLM requests in flight in this process")
+    group.add_argument('--max-retries', type=int, default=DEFAULT_MAX_RETRIES,
+                       help="Retries for rate-limited, timed-out or failed requests")
+
+
+def set_shared_client(client):
+    """Install `client` as the process-wide client (benchmarks use this to plug in a stand-in backend)."""
+    global _shared_client
+    with _shared_lock:
+        _shared_client = client
+    return client
+
+
+def configure_client(args):
+    """Replace the shared client with one using the limits given on the command line."""
+    return set_shared_client(LLMClient(requests_per_minute=args.rpm, tokens_per_minute=args.tpm,
+                                       max_concurrency=args.max_concurrency, max_retries=args.max_retries))
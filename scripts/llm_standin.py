@@ -0,0 +1,185 @@
+import json
+import time
+import random
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+from llm_cache import request_key
+from schema_registry import unwrap_schema
+from prompt_builder import count_tokens
+
+
+class StandInError(Exception):
+    """An injected API failure; shaped like openai.APIStatusError so llm_client retries it."""
+
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"stand-in error {status_code}")
+        self.status_code = status_code
+        headers = {} if retry_after is None else {"retry-after": str(retry_after)}
+        self.response = SimpleNamespace(status_code=status_code, headers=headers)
+
+
+def sample_instance(schema, rng, depth=0):
+    """A small document that validates against `schema` (objects, arrays, enums and scalars)."""
+    schema = unwrap_schema(schema) or {}
+    if "enum" in schema:
+        return rng.choice(schema["enum"])
+    schema_type = schema.get("type")
+    if isinstance(schema_type, list):
+        schema_type = next((t for t in schema_type if t != "null"), "null")
+    if schema_type == "object" or "properties" in schema:
+        return {key: sample_instance(value, rng, depth + 1) for key, value in schema.get("properties", {}).items()}
+    if schema_type == "array":
+        count = max(schema.get("minItems", 0), rng.randint(1, 4) if depth < 6 else 0)
+        return [sample_instance(schema.get("items", {}), rng, depth + 1) for _ in range(count)]
+    if schema_type == "integer":
+        return rng.randint(0, 100)
+    if schema_type == "number":
+        return round(rng.random() * 100, 2)
+    if schema_type == "boolean":
+        return rng.random() < 0.5
+    if schema_type == "null":
+        return None
+    return f"value_{rng.randint(0, 9999)}"
+
+
+def malform(text, rng):
+    """Break a JSON document the way models do: a trailing comma or a truncated tail."""
+    if rng.random() < 0.5:
+        close = max(text.rfind("}"), text.rfind("]"))
+        if close > 0:
+            return text[:close] + "," + text[close:]
+    return text[:max(1, len(text) * 2 // 3)]
+
+
+def schema_responder(routes, default=None, seed=0):
+    """
+    Responder that answers with a sampled instance of a schema.
+    `routes` is [(marker, schema)]: the first marker found in the request's
+    messages picks the schema; a json_schema response_format wins over both.
+    """
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    def respond(request):
+        response_format = request.get("response_format") or {}
+        schema = (response_format.get("json_schema") or {}).get("schema")
+        if schema is None:
+            text = " ".join(str(message.get("content", "")) for message in request.get("messages", []))
+            schema = next((route_schema for marker, route_schema in routes if marker in text), default)
+        with lock:
+            return json.dumps(sample_instance(schema or {}, rng), indent=2)
+
+    return respond
+
+
+def replay_responder(cache_dir, fallback=None):
+    """Responder that replays completions recorded by llm_cache.ResponseCache, keyed by request."""
+    recorded = {}
+    for path in Path(cache_dir).glob("*/*.json"):
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+            recorded[entry["key"]] = entry["content"]
+        except (OSError, ValueError, KeyError):
+            continue
+
+    def respond(request):
+        content = recorded.get(request_key(request))
+        if content is None:
+            if fallback is None:
+                raise KeyError(f"No recorded response for request {request_key(request)[:12]}")
+            return fallback(request)
+        return content
+
+    return respond
+
+
+def _completion(content, prompt_tokens):
+    completion_tokens = count_tokens(content)
+    return SimpleNamespace(
+        choices=[SimpleNamespace(index=0, finish_reason="stop",
+                                 message=SimpleNamespace(role="assistant", content=content))],
+        usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                              total_tokens=prompt_tokens + completion_tokens),
+    )
+
+
+class _Stream:
+    """Chunked completion with a per-chunk delay; close() stops it early like an SDK stream."""
+
+    def __init__(self, content, chunk_size, chunk_delay, usage=None):
+        self.content = content
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.usage = usage
+        self.closed = False
+        self.sent = 0
+
+    def __iter__(self):
+        for start in range(0, len(self.content), self.chunk_size):
+            if self.closed:
+                return
+            if self.chunk_delay:
+                time.sleep(self.chunk_delay)
+            piece = self.content[start:start + self.chunk_size]
+            self.sent += len(piece)
+            yield SimpleNamespace(choices=[SimpleNamespace(index=0, delta=SimpleNamespace(content=piece))], usage=None)
+        if self.usage is not None and not self.closed:
+            # include_usage: a final chunk with no choices carries the usage
+            yield SimpleNamespace(choices=[], usage=self.usage)
+
+    def close(self):
+        self.closed = True
+
+
+class LLMStandIn:
+    """
+    Offline, in-process replacement for the OpenAI client.
+
+    Exposes `chat.completions.create` (plain and stream=True) so it can be
+    passed to llm_client.LLMClient(openai_client=...). Answers come from
+    `responder(request) -> str`; latency, API errors and malformed JSON
+    are injected at the configured rates. Everything is seeded, so two runs
+    with the same settings see the same failures.
+    """
+
+    def __init__(self, responder, latency=0.05, jitter=0.02, error_rate=0.0, malformed_rate=0.0,
+                 chunk_size=64, chunk_delay=0.0, seed=0):
+        self.responder = responder
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "malformed": 0}
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _draw(self):
+        with self._lock:
+            self.stats["requests"] += 1
+            return (self._rng.uniform(-self.jitter, self.jitter), self._rng.random(),
+                    self._rng.random(), random.Random(self._rng.random()))
+
+    def create(self, stream=False, stream_options=None, **request):
+        jitter, error_draw, malformed_draw, rng = self._draw()
+        time.sleep(max(0.0, self.latency + jitter))
+        if error_draw < self.error_rate:
+            with self._lock:
+                self.stats["errors"] += 1
+            status = rng.choice((429, 500, 503))
+            raise StandInError(status, retry_after=0.05 if status == 429 else None)
+        content = self.responder(request)
+        if malformed_draw < self.malformed_rate:
+            with self._lock:
+                self.stats["malformed"] += 1
+            content = malform(content, rng)
+        prompt_tokens = sum(count_tokens(str(message.get("content", ""))) for message in request.get("messages", []))
+        completion = _completion(content, prompt_tokens)
+        if stream:
+            include_usage = (stream_options or {}).get("include_usage")
+            return _Stream(content, self.chunk_size, self.chunk_delay, completion.usage if include_usage else None)
+        return completion
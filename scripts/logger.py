@@ -1,32 +1,148 @@
+import os
+import json
+import queue
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+import threading
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 
-def setup_logger(name=__name__, log_file='app.log', level=logging.INFO):
+# Environment switches, read once at import:
+#   LOG_QUEUE=0      write synchronously on the calling thread instead of via a background listener
+#   LOG_FORMAT=json  write JSON lines instead of plain text
+#   LOG_MAX_CHARS=N  cap every logged message at N characters (0 disables)
+USE_QUEUE = os.environ.get('LOG_QUEUE', '1') != '0'
+JSON_LINES = os.environ.get('LOG_FORMAT', '').lower() == 'json'
+MAX_MESSAGE_CHARS = int(os.environ.get('LOG_MAX_CHARS', '20000'))
+
+_queue_handlers = {}
+_lock = threading.Lock()
+
+
+def truncate(text, limit=MAX_MESSAGE_CHARS):
+    """Cap `text` at `limit` characters, noting how much was cut."""
+    text = str(text)
+    if not limit or len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [truncated {len(text) - limit} chars]"
+
+
+def log_payload(logger, level, label, payload, limit=MAX_MESSAGE_CHARS):
+    """
+    Log a potentially large payload (e.g. a raw LLM response) as "label: payload".
+    Nothing is formatted unless the level is enabled, and the payload is truncated to `limit`.
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, f"{label}: {truncate(payload, limit)}")
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per record: time, logger, level, message (and exception, if any)."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "logger": record.name,
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class TruncatingFilter(logging.Filter):
+    """Cap message size so one oversized payload cannot bloat the log."""
+
+    def __init__(self, limit):
+        super().__init__()
+        self.limit = limit
+
+    def filter(self, record):
+        if self.limit:
+            message = record.getMessage()
+            if len(message) > self.limit:
+                record.msg = truncate(message, self.limit)
+                record.args = None
+        return True
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """Enqueue records as they are; formatting happens on the listener thread."""
+
+    def prepare(self, record):
+        return record
+
+
+def _build_handlers(log_file, level, json_lines):
+    # Formatter
+    if json_lines:
+        formatter = JsonLinesFormatter()
+    else:
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    truncating = TruncatingFilter(MAX_MESSAGE_CHARS)
+
+    # Console Handler
+    ch = logging.StreamHandler()
+    ch.setLevel(level)
+    ch.setFormatter(formatter)
+    ch.addFilter(truncating)
+
+    # File Handler with rotation
+    fh = RotatingFileHandler(log_file, maxBytes=5*1024*1024, backupCount=3)
+    fh.setLevel(level)
+    fh.setFormatter(formatter)
+    fh.addFilter(truncating)
+    return ch, fh
+
+
+def _queue_handler(log_file, json_lines):
+    """One queue, listener thread and set of output handlers per log file, shared by every logger writing to it."""
+    key = (os.path.abspath(log_file), json_lines)
+    with _lock:
+        handler = _queue_handlers.get(key)
+        if handler is None:
+            records = queue.SimpleQueue()
+            # Loggers filter by level before enqueueing, so the outputs accept everything
+            listener = QueueListener(records, *_build_handlers(log_file, logging.NOTSET, json_lines))
+            listener.start()
+            handler = _DeferredQueueHandler(records)
+            handler.listener = listener
+            _queue_handlers[key] = handler
+        return handler
+
+
+@atexit.register
+def stop_listeners():
+    """Flush queued records and stop the background writers (also run at exit)."""
+    with _lock:
+        handlers = list(_queue_handlers.values())
+        _queue_handlers.clear()
+    for handler in handlers:
+        handler.listener.stop()
+        for output in handler.listener.handlers:
+            output.close()
+
+
+def setup_logger(name=__name__, log_file='app.log', level=logging.INFO, json_lines=None):
     """
     Sets up a logger with the specified name, log file, and level.
     Logs are written to both console and the specified log file.
     The log file is rotated when it reaches 5MB, keeping up to 3 backup files.
+    By default records are handed to a background thread through a queue, so
+    logging never blocks the caller on formatting or file I/O; set LOG_QUEUE=0
+    to write synchronously. json_lines (default: LOG_FORMAT=json) switches the
+    output to one JSON object per line.
     """
     logger = logging.getLogger(name)
     logger.setLevel(level)
     logger.propagate = False  # Prevents logging from propagating to the root logger multiple times
 
     if not logger.handlers:
-        # Formatter
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-
-        # Console Handler
-        ch = logging.StreamHandler()
-        ch.setLevel(level)
-        ch.setFormatter(formatter)
-
-        # File Handler with rotation
-        fh = RotatingFileHandler(log_file, maxBytes=5*1024*1024, backupCount=3)
-        fh.setLevel(level)
-        fh.setFormatter(formatter)
-
-        # Add Handlers to the logger
-        logger.addHandler(ch)
-        logger.addHandler(fh)
+        json_lines = JSON_LINES if json_lines is None else json_lines
+        if USE_QUEUE:
+            logger.addHandler(_queue_handler(log_file, json_lines))
+        else:
+            for handler in _build_handlers(log_file, level, json_lines):
+                logger.addHandler(handler)
 
     return logger
@@ -0,0 +1,214 @@
+import json
+import time
+import threading
+from contextlib import contextmanager
+from logger import setup_logger
+from atomic_write import write_atomic
+
+# Initialize logger
+logger = setup_logger('Metrics', 'project_initializer.log')
+
+# USD per million tokens (input, output); update when pricing changes
+PRICES_PER_MTOK = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+}
+
+PHASES = ("request", "parse", "validate", "save")
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    """Estimated USD cost of a completion, or None for a model without a known price."""
+    prices = PRICES_PER_MTOK.get(model)
+    if prices is None:
+        # Dated snapshots (gpt-4o-mini-2024-07-18) are priced like their base model
+        prices = next((price for name, price in sorted(PRICES_PER_MTOK.items(), key=lambda item: -len(item[0]))
+                       if model and model.startswith(name + "-")), None)
+    if prices is None:
+        return None
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1e6
+
+
+def _new_stage():
+    entry = {f"{phase}_seconds": 0.0 for phase in PHASES}
+    entry.update({"total_seconds": 0.0, "status": None, "model": None, "requests": 0, "cache_hits": 0,
+                  "retries": 0, "repairs": 0, "candidates": 0, "prompt_tokens": 0, "completion_tokens": 0, "tokens_estimated": False,
+                  "cost_usd": 0.0})
+    return entry
+
+
+class MetricsRecorder:
+    """
+    Per-stage timings, token usage, retries and estimated cost for one run.
+
+    Stages run on scheduler threads, so the current stage is thread-local:
+    code inside `with metrics.stage(name)` records into that stage without
+    passing it around. Calls outside any stage are ignored. A stage entry can
+    be shared by several threads (see bound), so updates take the lock, and
+    phase times are wall time: while several threads are in the same phase
+    of a stage, that time is counted once.
+    """
+
+    def __init__(self, run_id=None):
+        self.run_id = run_id
+        self.stages = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # (id of a stage entry, phase) -> [threads in the phase, when the first entered it]
+        self._active = {}
+        self.started = time.time()
+
+    def _current(self):
+        return getattr(self._local, 'stage', None)
+
+    @contextmanager
+    def stage(self, name):
+        with self._lock:
+            entry = self.stages.setdefault(name, _new_stage())
+        self._local.stage = entry
+        start = time.perf_counter()
+        try:
+            yield entry
+        finally:
+            with self._lock:
+                entry["total_seconds"] += time.perf_counter() - start
+            self._local.stage = None
+
+    @contextmanager
+    def phase(self, phase):
+        entry = self._current()
+        if entry is None:
+            yield
+            return
+        with self._lock:
+            active = self._active.setdefault((id(entry), phase), [0, 0.0])
+            if not active[0]:
+                active[1] = time.perf_counter()
+            active[0] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                active[0] -= 1
+                if not active[0]:
+                    entry[f"{phase}_seconds"] += time.perf_counter() - active[1]
+
+    def set_status(self, status):
+        entry = self._current()
+        if entry is not None:
+            with self._lock:
+                entry["status"] = status
+
+    def record_request(self, model, prompt_tokens=0, completion_tokens=0, retries=0, cache_hit=False, estimated=False):
+        entry = self._current()
+        if entry is None:
+            return
+        cost = None if cache_hit else estimate_cost(model, prompt_tokens, completion_tokens)
+        with self._lock:
+            entry["model"] = model
+            entry["requests"] += 1
+            entry["retries"] += retries
+            if cache_hit:
+                entry["cache_hits"] += 1
+                return
+            entry["prompt_tokens"] += prompt_tokens
+            entry["completion_tokens"] += completion_tokens
+            entry["tokens_estimated"] = entry["tokens_estimated"] or estimated
+            if cost is not None:
+                entry["cost_usd"] += cost
+
+    def bound(self, fn):
+        """Wrap `fn` so that, run on another thread, it records into the caller's current stage."""
+        entry = self._current()
+
+        def run(*args, **kwargs):
+            previous = self._current()
+            self._local.stage = entry
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._local.stage = previous
+        return run
+
+    def record_candidates(self, count):
+        """Count the candidates raced for one completion."""
+        entry = self._current()
+        if entry is not None:
+            with self._lock:
+                entry["candidates"] += count
+
+    def record_repair(self):
+        """Count a response that was repaired locally instead of being re-requested."""
+        entry = self._current()
+        if entry is not None:
+            with self._lock:
+                entry["repairs"] += 1
+
+    def totals(self):
+        with self._lock:
+            stages = [dict(entry) for entry in self.stages.values()]
+        keys = [f"{phase}_seconds" for phase in PHASES] + ["total_seconds", "requests", "cache_hits", "retries", "repairs", "candidates",
+                                                            "prompt_tokens", "completion_tokens", "cost_usd"]
+        return {key: sum(stage[key] for stage in stages) for key in keys}
+
+    def to_json(self):
+        with self._lock:
+            stages = {name: dict(entry) for name, entry in self.stages.items()}
+        return {"run_id": self.run_id, "started": self.started, "stages": stages, "totals": self.totals()}
+
+    def summary(self):
+        lines = [f"{'stage':<28} {'request':>8} {'parse':>7} {'valid.':>7} {'save':>7} {'prompt':>8} {'compl.':>8} {'retry':>5} {'cost $':>9}"]
+        data = self.to_json()
+        rows = list(data["stages"].items()) + [("total", data["totals"])]
+        for name, entry in rows:
+            lines.append(f"{name:<28} {entry['request_seconds']:>7.2f}s {entry['parse_seconds']:>6.3f}s "
+                         f"{entry['validate_seconds']:>6.3f}s {entry['save_seconds']:>6.3f}s "
+                         f"{entry['prompt_tokens']:>8} {entry['completion_tokens']:>8} {entry['retries']:>5} "
+                         f"{entry['cost_usd']:>9.5f}")
+        return "\n".join(lines)
+
+    def prometheus(self, prefix="json_library_manager"):
+        """Metrics in the Prometheus text exposition format (for the node_exporter textfile collector)."""
+        data = self.to_json()
+        run = _escape(self.run_id or "")
+        series = {
+            "stage_phase_seconds": ("gauge", "Wall time per stage and phase"),
+            "stage_seconds": ("gauge", "Total wall time per stage"),
+            "stage_tokens": ("gauge", "Tokens used per stage"),
+            "stage_retries": ("gauge", "Retried requests per stage"),
+            "stage_repairs": ("gauge", "Responses repaired locally per stage"),
+            "stage_cost_usd": ("gauge", "Estimated cost per stage in USD"),
+            "run_cost_usd": ("gauge", "Estimated cost of the run in USD"),
+        }
+        samples = {name: [] for name in series}
+        for name, entry in data["stages"].items():
+            labels = f'run_id="{run}",stage="{_escape(name)}"'
+            for phase in PHASES:
+                samples["stage_phase_seconds"].append(f'{{{labels},phase="{phase}"}} {entry[f"{phase}_seconds"]:.6f}')
+            samples["stage_seconds"].append(f'{{{labels}}} {entry["total_seconds"]:.6f}')
+            samples["stage_tokens"].append(f'{{{labels},kind="prompt"}} {entry["prompt_tokens"]}')
+            samples["stage_tokens"].append(f'{{{labels},kind="completion"}} {entry["completion_tokens"]}')
+            samples["stage_retries"].append(f'{{{labels}}} {entry["retries"]}')
+            samples["stage_repairs"].append(f'{{{labels}}} {entry["repairs"]}')
+            samples["stage_cost_usd"].append(f'{{{labels}}} {entry["cost_usd"]:.8f}')
+        samples["run_cost_usd"].append(f'{{run_id="{run}"}} {data["totals"]["cost_usd"]:.8f}')
+        lines = []
+        for name, (kind, help_text) in series.items():
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            lines.extend(f"{prefix}_{name}{sample}" for sample in samples[name])
+        return "\n".join(lines) + "\n"
+
+    def export(self, json_path=None, prometheus_path=None):
+        if json_path:
+            write_atomic(json_path, json.dumps(self.to_json(), indent=4))
+            logger.info(f"Wrote metrics to {json_path}")
+        if prometheus_path:
+            write_atomic(prometheus_path, self.prometheus())
+            logger.info(f"Wrote Prometheus metrics to {prometheus_path}")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
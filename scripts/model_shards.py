@@ -0,0 +1,115 @@
+import re
+from prompt_builder import count_tokens, compact_json
+
+# Structure tokens per shard to aim for; smaller structures are not split
+SHARD_TARGET_TOKENS = 400
+DEFAULT_MAX_SHARDS = 6
+
+_NAME_KEY = re.compile(r"[^a-z0-9]")
+
+
+def _section_root(structure):
+    """
+    Descend through single-key wrappers ({"app": {"lib": {...}}}) to the first
+    level with several entries. Returns (path of wrapper keys, that level).
+    """
+    path = []
+    while isinstance(structure, dict) and len(structure) == 1:
+        key, value = next(iter(structure.items()))
+        if not isinstance(value, dict):
+            break
+        path.append(key)
+        structure = value
+    return path, structure
+
+
+def _wrap(path, entries):
+    for key in reversed(path):
+        entries = {key: entries}
+    return entries
+
+
+def split_structure(structure, max_shards=DEFAULT_MAX_SHARDS, target_tokens=SHARD_TARGET_TOKENS):
+    """
+    Split a structure.json document by its top-level directories (below any
+    single-key wrappers such as "lib") into at most `max_shards` parts of
+    roughly `target_tokens` each. Each shard keeps the wrapper path, so it
+    reads like a smaller structure.json. Entries are packed largest first
+    into the lightest shard. Returns [(name, shard)], a single shard holding
+    the whole structure when it is too small to be worth splitting.
+    """
+    path, level = _section_root(structure)
+    if not isinstance(level, dict) or len(level) < 2 or max_shards < 2:
+        return [("all", structure)]
+    sizes = {key: count_tokens(compact_json({key: value})) for key, value in level.items()}
+    count = min(max_shards, len(level), -(-sum(sizes.values()) // target_tokens))
+    if count < 2:
+        return [("all", structure)]
+
+    bins = [{"keys": [], "tokens": 0} for _ in range(count)]
+    for key in sorted(level, key=lambda key: -sizes[key]):
+        lightest = min(bins, key=lambda shard: shard["tokens"])
+        lightest["keys"].append(key)
+        lightest["tokens"] += sizes[key]
+    shards = []
+    for shard in bins:
+        # Keep the structure's own order within each shard
+        keys = [key for key in level if key in shard["keys"]]
+        shards.append(("+".join(keys), _wrap(path, {key: level[key] for key in keys})))
+    return shards
+
+
+def model_key(name):
+    """Identity of a model across shards: 'UserModel', 'user_model' and 'User' are the same model."""
+    key = _NAME_KEY.sub("", str(name).lower())
+    if key.endswith("model") and len(key) > len("model"):
+        key = key[:-len("model")]
+    return key
+
+
+def _merge_field(existing, field):
+    """Reconcile two definitions of the same field: nullable if either is, a concrete type over dynamic."""
+    if existing.get("field_type") == "dynamic" and field.get("field_type") not in (None, "dynamic"):
+        existing["field_type"] = field["field_type"]
+    if "is_nullable" in field:
+        existing["is_nullable"] = bool(existing.get("is_nullable")) or bool(field["is_nullable"])
+    if not existing.get("default_value") and field.get("default_value"):
+        existing["default_value"] = field["default_value"]
+
+
+def merge_models(documents):
+    """
+    Merge the models.json documents generated for each shard into one.
+    Models are matched by model_key; the most common spelling of the name
+    wins and fields are united by name, so baseline models every shard
+    defines (UserModel) appear once with all their fields. Order is first
+    appearance. Returns (merged document, duplicates merged).
+    """
+    merged = {}
+    spellings = {}
+    duplicates = 0
+    for document in documents:
+        for model in (document or {}).get("models", []):
+            key = model_key(model.get("model_name", ""))
+            spellings.setdefault(key, {})
+            spellings[key][model.get("model_name")] = spellings[key].get(model.get("model_name"), 0) + 1
+            if key not in merged:
+                merged[key] = {"model": dict(model, fields=[]), "fields": {}}
+            else:
+                duplicates += 1
+            entry = merged[key]
+            for field in model.get("fields", []):
+                field_key = str(field.get("field_name", "")).lower()
+                if field_key in entry["fields"]:
+                    _merge_field(entry["fields"][field_key], field)
+                else:
+                    entry["fields"][field_key] = dict(field)
+                    entry["model"]["fields"].append(entry["fields"][field_key])
+
+    models = []
+    for key, entry in merged.items():
+        counts = spellings[key]
+        # Ties go to a Dart class-style name (UserModel over usermodel), then to the first seen
+        entry["model"]["model_name"] = max(counts, key=lambda name: (counts[name], str(name)[:1].isupper()))
+        models.append(entry["model"])
+    return {"models": models}, duplicates
@@ -1,20 +1,114 @@
-import os
 import json
-from openai import OpenAI
 import sys
 import re
+import time
+import logging
+import argparse
+import threading
 from pathlib import Path
-from logger import setup_logger
-from jsonschema import validate, ValidationError
+from concurrent.futures import ThreadPoolExecutor
+from logger import setup_logger, log_payload
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+from stage_scheduler import Stage, StageScheduler, format_latency_report
+from llm_cache import ResponseCache, add_cache_arguments, cache_from_args
+from checkpoints import CheckpointStore, fingerprint
+from atomic_write import write_atomic
+import schema_registry
+from prompt_builder import DEFAULT_TOKEN_BUDGET, PromptSection, TokenLedger, build_sections, indented_tokens, count_tokens
+from json_stream import JSONStreamValidator, StreamAbort
+from json_repair import JSONRepairError, repair_json, describe_fixes
+import llm_client
+import state_journal
+from metrics import MetricsRecorder, estimate_cost
+import speculative
+from model_shards import DEFAULT_MAX_SHARDS, split_structure, merge_models
 
 # Initialize logger
 logger = setup_logger('ProjectInitializer', 'project_initializer.log')
 
-# Ensure OpenAI API key is set
-client = OpenAI()
-if not client.api_key:
-    logger.critical("OPENAI_API_KEY environment variable not set.")
-    sys.exit("Please set the OPENAI_API_KEY environment variable.")
+# Stage schemas ship with the repository, apart from any project's generated artifacts
+DEFAULT_SCHEMA_DIR = Path(__file__).resolve().parent.parent / "schemas"
+
+class InitializerConfig:
+    """
+    Resources shared by the generators, created on first use.
+
+    Importing this module must not touch the network or the alignment files,
+    so the shared LLM client connects the first time a request is made and each
+    schema is read the first time it is needed, from `schema_dir`, which the
+    pipeline never writes to (artifacts go to <project>/alignment_files).
+    Schemas are memoized for the life of the process.
+    """
+
+    def __init__(self, schema_dir=DEFAULT_SCHEMA_DIR, model="gpt-4o-mini", prompt_token_budget=DEFAULT_TOKEN_BUDGET):
+        self.schema_dir = Path(schema_dir)
+        self.model = model
+        self.prompt_token_budget = prompt_token_budget
+        # Streamed completions are checked as they arrive and retried when they go bad
+        self.stream = False
+        self.stream_retries = 2
+        # Write artifacts minified instead of with 4-space indentation
+        self.compact_json = False
+        # Request each artifact as strict structured output generated from its schema
+        self.strict = True
+        # Candidates requested in parallel per completion (first valid wins), and
+        # the ceiling in USD on their combined worst-case cost
+        self.candidates = 1
+        self.candidate_cost_ceiling = None
+        # Most parallel requests models.json is split into (1 asks for it in one response)
+        self.model_shards = DEFAULT_MAX_SHARDS
+        self._schemas = {}
+        self._response_formats = {}
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        """The process-wide rate-limited client (see llm_client.LLMClient)."""
+        return llm_client.shared_client()
+
+    def schema(self, filename):
+        """Return the schema stored in <schema_dir>/<filename>, or an accept-all schema if it is missing or empty."""
+        with self._lock:
+            if filename not in self._schemas:
+                path = self.schema_dir / filename
+                if not path.is_file() or path.stat().st_size == 0:
+                    logger.warning(f"Schema {path} is missing or empty; {filename} will not be validated.")
+                    self._schemas[filename] = {}
+                else:
+                    self._schemas[filename] = schema_registry.load_schema_file(path)
+            return self._schemas[filename]
+
+    def response_format(self, filename):
+        """
+        The response_format for the stage producing <filename>, built once from
+        its schema (see schema_registry.response_format), or None when strict
+        structured outputs are turned off.
+        """
+        if not self.strict:
+            return None
+        schema = self.schema(filename)
+        with self._lock:
+            if filename not in self._response_formats:
+                self._response_formats[filename] = schema_registry.response_format(Path(filename).stem, schema)
+            return self._response_formats[filename]
+
+config = InitializerConfig()
+
+# Artifacts generated for every project, in stage order
+ARTIFACTS = ('structure.json', 'models.json', 'other_values.json')
+
+# Content-addressed cache of raw completions; reconfigured from the CLI in main()
+response_cache = ResponseCache()
+
+# Prompt tokens sent per stage, and how many compact serialization and pruning saved
+token_ledger = TokenLedger()
+
+# Per-stage timings, token usage, retries and cost for this run
+metrics = MetricsRecorder(run_id=state_journal.RUN_ID)
 
 def load_subject(file_path='alignment_files/subject.json'):
     """Load the game description from subject.json."""
@@ -34,25 +128,44 @@ def load_subject(file_path='alignment_files/subject.json'):
             logger.error(f"Error decoding {file_path}: {e}")
             raise
 
-def save_json(data, filename):
-    """Save a dictionary as a JSON file in the alignment_files folder."""
-    folder = Path("alignment_files")
-    folder.mkdir(exist_ok=True)  # Create folder if it doesn't exist
+def encode_json(data, compact=False):
+    """
+    Serialize to UTF-8 bytes in one piece. Compact output uses orjson when it
+    is installed; indented output keeps the 4-space layout of the existing files.
+    """
+    if compact:
+        if orjson is not None:
+            return orjson.dumps(data)
+        return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return json.dumps(data, indent=4).encode('utf-8')
+
+def save_json(data, filename, folder="alignment_files", compact=None):
+    """
+    Save a dictionary as a JSON file in the alignment_files folder.
+    The file is written to a temporary sibling and renamed over the target, so
+    a crash never leaves a truncated file; unchanged content is not rewritten.
+    Returns True if the file was written.
+    """
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)  # Create folder if it doesn't exist
     file_path = folder / filename
+    payload = encode_json(data, config.compact_json if compact is None else compact)
     try:
-        with open(file_path, 'w') as f:
-            json.dump(data, f, indent=4)
+        if file_path.is_file() and file_path.stat().st_size == len(payload) and file_path.read_bytes() == payload:
+            logger.info(f"{file_path} is unchanged, not rewritten")
+            return False
+        write_atomic(file_path, payload, fsync=True)
         logger.info(f"Saved {file_path}")
+        return True
     except Exception as e:
         logger.error(f"Failed to save {file_path}: {e}")
         raise
 
 
-def extract_json(content):
+def strip_code_fences(content):
     """
-    Extract JSON content from a string, removing any markdown code block delimiters.
+    Remove any markdown code block delimiters around JSON content.
     """
-    logger.debug("Extracting JSON content from string")
     # Remove ```json and ``` if present
     json_pattern = re.compile(r"```json\s*(.*?)\s*```", re.DOTALL)
     match = json_pattern.search(content)
@@ -68,6 +181,176 @@ def extract_json(content):
     # If no code block, return the content as is
     return content.strip()
 
+def extract_json(content, label="response"):
+    """
+    Extract JSON content from a string, removing any markdown code block delimiters.
+    If the result does not parse, repair it locally (trailing commas, truncated
+    tails, single quotes, surrounding prose, ...) and log what was fixed. When
+    it cannot be repaired the text is returned as is, so json.loads raises and
+    the stage fails and is re-requested as before.
+    """
+    logger.debug("Extracting JSON content from string")
+    cleaned = strip_code_fences(content)
+    try:
+        json.loads(cleaned)
+        return cleaned
+    except ValueError as e:
+        parse_error = e
+    try:
+        repaired, fixes = repair_json(cleaned)
+    except JSONRepairError as e:
+        logger.warning(f"Could not repair {label} ({parse_error}): {e}")
+        return cleaned
+    logger.warning(f"Repaired {label} locally ({parse_error}): {describe_fixes(fixes)}")
+    metrics.record_repair()
+    return repaired
+
+def prompt_documents(stage, *sections):
+    """
+    Serialize the JSON documents embedded in a prompt within the configured
+    token budget and record the tokens saved against indented JSON.
+    Returns {label: text}.
+    """
+    texts = build_sections(list(sections), config.prompt_token_budget)
+    baseline = sum(indented_tokens(section.data) for section in sections)
+    token_ledger.record(stage, baseline, sum(section.tokens for section in sections))
+    return texts
+
+def stream_completion(request, schema=None, label="completion"):
+    """
+    Stream a chat completion, checking the JSON incrementally against `schema`.
+    As soon as the partial output is provably invalid the stream is closed and
+    the request is sent again, up to config.stream_retries more times.
+    Aborted attempts record their own usage. Returns (text, usage or None,
+    retries of the final attempt).
+    """
+    last_error = None
+    # A strict response_format answers optional properties with null, so check
+    # the stream against the normalized schema that was actually sent
+    json_schema = (request.get('response_format') or {}).get('json_schema') or {}
+    if json_schema.get('strict'):
+        schema = json_schema['schema']
+    for attempt in range(1, config.stream_retries + 2):
+        validator = JSONStreamValidator(schema)
+        chunks = []
+        usage = None
+        start = time.perf_counter()
+        speculative.check_cancelled()
+        stream = config.client.create(**request, stream=True, stream_options={"include_usage": True})
+        retries = config.client.last_retries() + (attempt > 1)
+        try:
+            for chunk in stream:
+                # With include_usage the final chunk carries usage and no choices
+                usage = getattr(chunk, 'usage', None) or usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    chunks.append(delta)
+                    validator.feed(delta)
+                speculative.check_cancelled()
+            validator.finish()
+            return "".join(chunks).strip(), usage, retries
+        except speculative.CandidateCancelled:
+            # Another candidate won; count what this one consumed before it was closed
+            record_usage(request, "".join(chunks), None, retries)
+            raise
+        except StreamAbort as e:
+            # The aborted attempt was still billed for what it streamed
+            record_usage(request, "".join(chunks), usage, retries)
+            last_error = e
+            logger.warning(f"Aborted {label} stream after {e.position} chars and {time.perf_counter() - start:.2f}s "
+                           f"(attempt {attempt}/{config.stream_retries + 1}): {e.reason}")
+        finally:
+            close = getattr(stream, 'close', None)
+            if close is not None:
+                close()
+    raise last_error
+
+def request_completion(schema=None, label="completion", **request):
+    """
+    Return the completion text for a chat request.
+    Identical requests are answered from the response cache; fresh answers are stored in it.
+    With config.stream, the completion is streamed and checked against `schema` as it arrives.
+    With config.candidates > 1, several completions race and the first valid one is returned.
+    A response_format of None is left out of the request.
+    """
+    if request.get('response_format', False) is None:
+        del request['response_format']
+    with metrics.phase('request'):
+        raw_content = response_cache.get(request)
+        if raw_content is not None:
+            metrics.record_request(request.get('model'), cache_hit=True)
+            return raw_content
+        if config.candidates > 1:
+            raw_content = speculate(request, schema, label)
+        else:
+            raw_content = complete(request, schema, label)
+        response_cache.put(request, raw_content)
+        return raw_content
+
+def complete(request, schema=None, label="completion"):
+    """Send one chat request (streamed with config.stream) and record its usage. Returns the completion text."""
+    if config.stream:
+        raw_content, usage, retries = stream_completion(request, schema, label)
+    else:
+        speculative.check_cancelled()
+        response = config.client.create(**request)
+        raw_content = response.choices[0].message.content.strip()
+        usage, retries = getattr(response, 'usage', None), config.client.last_retries()
+    record_usage(request, raw_content, usage, retries)
+    return raw_content
+
+def candidate_count(request):
+    """
+    How many candidates to race for `request`: config.candidates, reduced so
+    their combined worst-case cost (prompt plus max_tokens of output each)
+    stays within config.candidate_cost_ceiling. At least one always runs.
+    """
+    if config.candidate_cost_ceiling is None:
+        return config.candidates
+    worst_case = estimate_cost(request.get('model'), prompt_token_estimate(request), request.get('max_tokens') or 0)
+    if not worst_case:
+        return config.candidates
+    return max(1, min(config.candidates, int(config.candidate_cost_ceiling // worst_case)))
+
+def speculate(request, schema, label):
+    """
+    Send the same request as several parallel candidates, parse and validate
+    each as it arrives, and return the text of the first valid one. The rest
+    are cancelled (streamed candidates stop at their next chunk).
+    """
+    def candidate(index):
+        raw_content = complete(request, schema, label)
+        speculative.check_cancelled()
+        data = json.loads(extract_json(raw_content, label=label))
+        if schema:
+            schema_registry.check(schema_registry.drop_null_optionals(data, schema), schema)
+        return raw_content
+
+    speculation = speculative.Speculation(candidate_count(request), label=label)
+    if speculation.candidates < config.candidates:
+        logger.info(f"{label}: racing {speculation.candidates} of {config.candidates} candidates "
+                    f"to stay within ${config.candidate_cost_ceiling}")
+    try:
+        return speculation.run(metrics.bound(candidate))
+    finally:
+        metrics.record_candidates(speculation.candidates)
+
+def prompt_token_estimate(request):
+    """Local estimate of the prompt tokens in a chat request."""
+    return sum(count_tokens(str(message.get('content', ''))) for message in request.get('messages', []))
+
+def record_usage(request, raw_content, usage, retries):
+    """Record token usage for the current stage, estimating it locally when the API did not report it."""
+    prompt_tokens = getattr(usage, 'prompt_tokens', None)
+    completion_tokens = getattr(usage, 'completion_tokens', None)
+    estimated = not isinstance(prompt_tokens, int) or not isinstance(completion_tokens, int)
+    if estimated:
+        prompt_tokens = prompt_token_estimate(request)
+        completion_tokens = count_tokens(raw_content)
+    metrics.record_request(request.get('model'), prompt_tokens, completion_tokens, retries, estimated=estimated)
+
 def generate_structure(subject):
     """Generate structure.json using OpenAI."""
     logger.debug("Generating structure.json using OpenAI")
@@ -79,9 +362,13 @@ Description:
 
 **Do not include any code block delimiters. Provide only the JSON content.**
 """
+    raw_content = None
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
+        raw_content = request_completion(
+            schema=config.schema('structure.json'),
+            label='structure.json',
+            model=config.model,
+            response_format=config.response_format('structure.json'),
             messages=[
                 {
                 "role": "system",
@@ -105,67 +392,125 @@ Description:
             temperature=1.35,
             max_tokens=10000
         )
-        raw_content = response.choices[0].message.content.strip()
-        cleaned_content = extract_json(raw_content)
-        structure = json.loads(cleaned_content)
+        with metrics.phase('parse'):
+            cleaned_content = extract_json(raw_content, label='structure.json')
+            structure = json.loads(cleaned_content)
         logger.info("Generated structure.json successfully.")
         return structure
     except Exception as e:
         logger.error(f"Error generating structure.json: {e}")
-        logger.debug(f"Received response: {raw_content}")
+        log_payload(logger, logging.DEBUG, "Received response", raw_content)
         raise
 
-def generate_models(structure_json):
-    """Generate models.json using OpenAI."""
+def generate_models(structure_json, subject=None):
+    """
+    Generate models.json using OpenAI.
+    Larger structures are split by top-level directory (see model_shards); the
+    shards are generated concurrently and merged, with models several shards
+    define (such as usermodel) reconciled into one.
+    """
     logger.debug("Generating models.json using OpenAI")
-    subject = load_subject()
-    prompt = ("Analyze the subject and structure provided and then define all the required models. I require a model for all code and files across my codebase.")
-          
+    if subject is None:
+        subject = load_subject()
+    shards = split_structure(structure_json, config.model_shards)
+    if len(shards) == 1:
+        return generate_model_shard(subject, structure_json)
+
+    names = [name for name, _ in shards]
+    logger.info(f"Generating models.json in {len(shards)} shards: {', '.join(names)}")
+    with ThreadPoolExecutor(max_workers=len(shards), thread_name_prefix='models-shard') as pool:
+        futures = [pool.submit(metrics.bound(generate_model_shard), subject, shard, name,
+                               [other for other in names if other != name])
+                   for name, shard in shards]
+        documents = [future.result() for future in futures]
+    models, duplicates = merge_models(documents)
+    logger.info(f"Merged {len(shards)} model shards into {len(models['models'])} models "
+                f"({duplicates} duplicate definitions reconciled).")
+    return models
+
+def generate_model_shard(subject, structure_json, shard=None, other_shards=()):
+    """
+    Generate the models for `structure_json`: the whole structure, or the part
+    of it named `shard`, in which case the response is validated on its own
+    so a bad shard is not cached or merged.
+    """
+    label = 'models.json' if shard is None else f'models.json[{shard}]'
+    if shard is None:
+        prompt = ("Analyze the subject and structure provided and then define all the required models. I require a model for all code and files across my codebase.")
+    else:
+        prompt = (f"Analyze the subject and the '{shard}' part of the structure provided and then define all the models required by the code and files in that part."
+                  f" The rest of the codebase ({', '.join(other_shards)}) is covered separately; include any baseline models this part relies on.")
+    documents = prompt_documents(label,
+                                 PromptSection('subject', subject, priority=0),
+                                 PromptSection('structure', structure_json, priority=1))
+
+    raw_content = None
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
+        raw_content = request_completion(
+            schema=config.schema('models.json'),
+            label=label,
+            model=config.model,
+            response_format=config.response_format('models.json'),
             messages=[
                     { "role": "system", "content": ( "I am tasked with defining and mapping an entire DART 'model' set. This is required to produce a high fidelity app given a 'subject' and the finalized 'file structure'."
                                                     " I will begin by identifying the files in the 'file structure' that will require a model. I will then analyze the code, their relationships within the application, and define the 'model' required." "" ) }, 
                     { "role": "system", "content": ( " I will first create an accurate mapping, allowing for and keeping all models in clean 'layers'." 
                                                     " I will provide an optimized and complete definition of all required 'models'. I will reuse models where possible, such as usermodel serving both profile and auth." " I will always include 'baseline models' by default alongside the app subject-specific models. For instance, usermodel can be considered a baseline model." ) },
-                    {"role": "assistant", "content": f"{subject}"}, 
-                    {"role": "assistant", "content": f"{json.dumps(structure_json, indent=4)}"},
+                    {"role": "assistant", "content": documents['subject']},
+                    {"role": "assistant", "content": documents['structure']},
                     {"role": "user", "content": f"{prompt}"}
             ],
             temperature=1.35,
             max_tokens=5000
         )
-        raw_content = response.choices[0].message.content.strip()
-        cleaned_content = extract_json(raw_content)
-        models = json.loads(cleaned_content)
-        logger.info("Generated models.json successfully.")
+        with metrics.phase('parse'):
+            cleaned_content = extract_json(raw_content, label=label)
+            models = json.loads(cleaned_content)
+        if shard is not None:
+            with metrics.phase('validate'):
+                schema = config.schema('models.json')
+                models = schema_registry.drop_null_optionals(models, schema)
+                if schema:
+                    schema_registry.check(models, schema)
+        logger.info(f"Generated {label} successfully.")
         return models
     except Exception as e:
-        logger.error(f"Error generating models.json: {e}")
-        logger.debug(f"Received response: {raw_content}")
+        if shard is not None:
+            # Shards are cached on this worker thread; run_step can only discard its own
+            response_cache.discard_last()
+        logger.error(f"Error generating {label}: {e}")
+        log_payload(logger, logging.DEBUG, "Received response", raw_content)
         raise
 
 def generate_other_values(subject_json, structure_json, models_json):
     """Generate other_values.json using OpenAI."""
     logger.debug("Generating other_values.json using OpenAI")
+    # The subject's long free-text fields are the cheapest context to give up
+    documents = prompt_documents('other_values.json',
+                                 PromptSection('subject', {"subject": subject_json}, priority=0),
+                                 PromptSection('structure', structure_json, priority=1),
+                                 PromptSection('models', models_json, priority=2))
     prompt = f"""
 Based on the following subject, structure, and models, generate a JSON file containing predefined events, states, function signatures, and other reusable values.
 
 Subject:
-{json.dumps({"subject": subject_json}, indent=4)}
+{documents['subject']}
 
 Structure:
-{json.dumps(structure_json, indent=4)}
+{documents['structure']}
 
 Models:
-{json.dumps(models_json, indent=4)}
+{documents['models']}
 
 **Do not include any code block delimiters. Provide only the JSON content.**
 """
+    raw_content = None
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
+        raw_content = request_completion(
+            schema=config.schema('other_values.json'),
+            label='other_values.json',
+            model=config.model,
+            response_format=config.response_format('other_values.json'),
             messages=[
                     {
                     "role": "system",
@@ -221,119 +566,213 @@ Models:
             temperature=1.35,
             max_tokens=5000
         )
-        raw_content = response.choices[0].message.content.strip()
-        cleaned_content = extract_json(raw_content)
-        other_values = json.loads(cleaned_content)
+        with metrics.phase('parse'):
+            cleaned_content = extract_json(raw_content, label='other_values.json')
+            other_values = json.loads(cleaned_content)
         logger.info("Generated other_values.json successfully.")
         return other_values
     except Exception as e:
         logger.error(f"Error generating other_values.json: {e}")
-        logger.debug(f"Received response: {raw_content}")
+        log_payload(logger, logging.DEBUG, "Received response", raw_content)
         raise
 
-def generate_state_report(file_name, status, details):
-    """Generate or update a state report."""
+def generate_state_report(file_name, status, details, duration=None):
+    """
+    Record a stage outcome in the append-only state journal (state_report.jsonl).
+    The state_report.json view is regenerated from the journal at the end of main(),
+    or on demand with `python scripts/state_journal.py compact`.
+    """
     logger.debug(f"Generating state report for {file_name}")
     report_entry = {
         "file": file_name,
         "status": status,
-        "details": details
+        "details": details,
+        "duration": None if duration is None else round(duration, 3)
     }
-    report_path = Path('state_report.json')
     try:
-        if report_path.is_file():
-            with open(report_path, 'r') as f:
-                report_data = json.load(f)
-        else:
-            report_data = []
-        report_data.append(report_entry)
-        with open(report_path, 'w') as f:
-            json.dump(report_data, f, indent=4)
+        state_journal.append(report_entry)
         logger.info(f"State report updated for {file_name}: {status}")
     except Exception as e:
-        logger.error(f"Failed to update state_report.json: {e}")
+        logger.error(f"Failed to append to {state_journal.JOURNAL_PATH}: {e}")
         raise
 
 
-# Specify the file path
-structure= 'alignment_files/structure.json'
-
-# Open the JSON file and load the structure
-with open(structure, 'r') as json_file:
-   structure= json.load(json_file)
-
-
-# Define JSON Schemas
-STRUCTURE_SCHEMA = structure
-
-# Specify the file path
-models= 'alignment_files/models.json'
-
-# Open the JSON file and load the other_values
-with open(models, 'r') as json_file:
-    models= json.load(json_file)
-
-MODELS_SCHEMA = models
-
-# Specify the file path
-other_values = 'alignment_files/other_values.json'
-
-# Open the JSON file and load the other_values
-with open(other_values, 'r') as json_file:
-    other_values = json.load(json_file)
-
-# Print the loaded data
-print(other_values)
-
-OTHER_VALUES_SCHEMA = other_values
-
-def validate_json(data, schema, filename):
-    """Validate JSON data against a schema."""
+def validate_json(data, schema, filename, collect_all=False):
+    """
+    Validate JSON data against a schema using the compiled validator registry.
+    collect_all=True logs every violation instead of stopping at the first one.
+    """
     logger.debug(f"Validating {filename} against schema")
     try:
-        validate(instance=data, schema=schema)
+        schema_registry.check(data, schema, collect_all=collect_all)
         logger.info(f"{filename} validation passed.")
-    except ValidationError as ve:
+    except schema_registry.ValidationError as ve:
+        for error in getattr(ve, 'all_errors', []):
+            logger.error(f"{filename} at {'/'.join(str(p) for p in error.absolute_path) or '<root>'}: {error.message}")
         logger.error(f"{filename} validation failed: {ve.message}")
         raise
 
-def main():
+def build_project_stages(project_dir, resume=False, collect_all=False):
+    """
+    Build the structure -> models -> other_values stages for one project.
+    The subject is read from, and artifacts written to, <project_dir>/alignment_files.
+    With resume=True, stages whose checkpointed artifact and inputs are unchanged are not regenerated.
+    With collect_all=True, validation reports every schema violation rather than the first.
+    """
+    project = str(project_dir)
+    folder = Path(project_dir) / "alignment_files"
+    prefix = "" if project == "." else f"{project}:"
+    checkpoints = CheckpointStore(folder)
+
+    def run_step(file_name, generate, schema, inputs):
+        report_name = f"{prefix}{file_name}"
+        with metrics.stage(report_name):
+            inputs_fingerprint = fingerprint(file_name, inputs)
+            start = time.perf_counter()
+            if resume:
+                data = checkpoints.load(file_name, inputs_fingerprint)
+                if data is not None:
+                    try:
+                        validate_json(data, schema, file_name)
+                        metrics.set_status('Resumed')
+                        generate_state_report(report_name, 'Resumed', f'{file_name} reused from a valid checkpoint.',
+                                              time.perf_counter() - start)
+                        return data
+                    except Exception as e:
+                        logger.info(f"Checkpointed {file_name} no longer validates, regenerating: {e}")
+            try:
+                # Scheduler threads serve many stages; only this stage's own response may be discarded below
+                response_cache.forget_last()
+                data = generate()
+                with metrics.phase('validate'):
+                    # Strict mode answers optional properties with null
+                    data = schema_registry.drop_null_optionals(data, schema)
+                    validate_json(data, schema, file_name, collect_all=collect_all)
+                with metrics.phase('save'):
+                    save_json(data, file_name, folder)
+                    checkpoints.record(file_name, file_name, inputs_fingerprint)
+                metrics.set_status('Success')
+                generate_state_report(report_name, 'Success', f'{file_name} generated and validated successfully.',
+                                      time.perf_counter() - start)
+                return data
+            except Exception as e:
+                # Never replay a response that failed to parse or validate
+                response_cache.discard_last()
+                metrics.set_status('Failed')
+                checkpoints.invalidate(file_name)
+                generate_state_report(report_name, 'Failed', str(e), time.perf_counter() - start)
+                logger.error(f"Error generating {report_name}: {e}")
+                raise
+
+    def subject_stage(inputs):
+        return load_subject(str(folder / 'subject.json'))
+
+    def structure_stage(inputs):
+        subject = inputs[f"{prefix}subject"]
+        return run_step('structure.json', lambda: generate_structure(subject), config.schema('structure.json'),
+                        [subject])
+
+    def models_stage(inputs):
+        subject = inputs[f"{prefix}subject"]
+        structure = inputs[f"{prefix}structure"]
+        return run_step('models.json', lambda: generate_models(structure, subject), config.schema('models.json'),
+                        [subject, structure])
+
+    def other_values_stage(inputs):
+        subject = inputs[f"{prefix}subject"]
+        structure = inputs[f"{prefix}structure"]
+        models = inputs[f"{prefix}models"]
+        return run_step('other_values.json', lambda: generate_other_values(subject, structure, models), config.schema('other_values.json'),
+                        [subject, structure, models])
+
+    return [
+        Stage(f"{prefix}subject", subject_stage, project=project),
+        Stage(f"{prefix}structure", structure_stage, [f"{prefix}subject"], project=project),
+        Stage(f"{prefix}models", models_stage, [f"{prefix}subject", f"{prefix}structure"], project=project),
+        Stage(f"{prefix}other_values", other_values_stage,
+              [f"{prefix}subject", f"{prefix}structure", f"{prefix}models"], project=project),
+    ]
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate alignment files for one or more projects.")
+    parser.add_argument('projects', nargs='*', default=['.'],
+                        help="Project directories, each containing alignment_files/subject.json (default: current directory)")
+    parser.add_argument('--schema-dir', default=str(DEFAULT_SCHEMA_DIR),
+                        help="Directory holding the stage schemas (structure.json, models.json, other_values.json)")
+    parser.add_argument('--max-workers', type=int, default=4,
+                        help="Maximum number of stages (LLM requests) in flight at once")
+    parser.add_argument('--resume', action='store_true',
+                        help="Reuse artifacts whose checkpoint is still valid and restart from the first stale or failed stage")
+    parser.add_argument('--collect-all-errors', action='store_true',
+                        help="Report every schema violation instead of stopping at the first")
+    parser.add_argument('--prompt-token-budget', type=int, default=DEFAULT_TOKEN_BUDGET,
+                        help="Token budget for the JSON embedded in each prompt; larger documents are pruned (0 disables pruning)")
+    parser.add_argument('--stream', action='store_true',
+                        help="Stream completions, validating the JSON as it arrives and retrying as soon as it is invalid")
+    parser.add_argument('--stream-retries', type=int, default=2,
+                        help="Extra attempts after a streamed completion is aborted")
+    parser.add_argument('--metrics-json', metavar='PATH',
+                        help="Write per-stage timing, token and cost metrics as JSON")
+    parser.add_argument('--metrics-prom', metavar='PATH',
+                        help="Write the same metrics in Prometheus textfile format")
+    parser.add_argument('--compact-json', action='store_true',
+                        help="Write generated alignment files without indentation")
+    parser.add_argument('--no-strict', dest='strict', action='store_false',
+                        help="Do not send the stage schemas as strict structured-output response formats")
+    parser.add_argument('--model-shards', type=int, default=DEFAULT_MAX_SHARDS,
+                        help="Split models.json generation by top-level directory into up to this many parallel requests (1 disables)")
+    parser.add_argument('--candidates', type=int, default=1,
+                        help="Completions to request in parallel per stage; the first that parses and validates wins")
+    parser.add_argument('--candidate-cost-ceiling', type=float, metavar='USD',
+                        help="Cap on the combined worst-case cost of one stage's candidates (fewer are raced if needed)")
+    add_cache_arguments(parser)
+    llm_client.add_client_arguments(parser)
+    args = parser.parse_args(argv)
+    schema_dir = Path(args.schema_dir).resolve()
+    for project_dir in args.projects:
+        if (Path(project_dir) / "alignment_files").resolve() == schema_dir:
+            # The artifacts would be written over the schemas and read back as schemas on the next run
+            parser.error(f"--schema-dir {args.schema_dir} is where {project_dir}'s artifacts are written")
+    return args
+
+def main(argv=None):
+    global response_cache
+    args = parse_args(argv)
+    response_cache = cache_from_args(args)
+    config.schema_dir = Path(args.schema_dir)
+    config.prompt_token_budget = args.prompt_token_budget
+    config.stream = args.stream
+    config.stream_retries = args.stream_retries
+    config.compact_json = args.compact_json
+    config.strict = args.strict
+    config.candidates = args.candidates
+    config.model_shards = args.model_shards
+    config.candidate_cost_ceiling = args.candidate_cost_ceiling
+    llm_client.configure_client(args)
     try:
-        # Load game description
-        logger.info("Starting project initialization")
-        subject = load_subject()
-
-        # Generate structure.json
-        try:
-            structure = generate_structure(subject)
-            validate_json(structure, STRUCTURE_SCHEMA, 'structure.json')
-            save_json(structure, 'structure.json')
-            generate_state_report('structure.json', 'Success', 'structure.json generated and validated successfully.')
-        except Exception as e:
-            generate_state_report('structure.json', 'Failed', str(e))
-            logger.error(f"Error generating structure.json: {e}")
-            sys.exit(1)
-
-        # Generate models.json
-        try:
-            models = generate_models(structure)
-            validate_json(models, MODELS_SCHEMA, 'models.json')
-            save_json(models, 'models.json')
-            generate_state_report('models.json', 'Success', 'models.json generated and validated successfully.')
-        except Exception as e:
-            generate_state_report('models.json', 'Failed', str(e))
-            logger.error(f"Error generating models.json: {e}")
-            sys.exit(1)
-
-        # Generate other_values.json
-        try:
-            other_values = generate_other_values(subject, structure, models)
-            validate_json(other_values, OTHER_VALUES_SCHEMA, 'other_values.json')
-            save_json(other_values, 'other_values.json')
-            generate_state_report('other_values.json', 'Success', 'other_values.json generated and validated successfully.')
-        except Exception as e:
-            generate_state_report('other_values.json', 'Failed', str(e))
-            logger.error(f"Error generating other_values.json: {e}")
+        if not args.replay:
+            config.client.connect()  # Fail fast on a missing API key instead of once per stage
+        # Normalize every stage schema for strict mode once, so a bad schema fails before any request
+        for filename in ARTIFACTS:
+            config.response_format(filename)
+        logger.info(f"Starting project initialization for {len(args.projects)} project(s), run {state_journal.RUN_ID}")
+        stages = []
+        for project_dir in args.projects:
+            stages.extend(build_project_stages(project_dir, resume=args.resume,
+                                                collect_all=args.collect_all_errors))
+
+        scheduler = StageScheduler(stages, max_workers=args.max_workers)
+        scheduler.run()
+        logger.info("Stage latency:\n" + format_latency_report(scheduler.timings, scheduler.total_seconds))
+        logger.info(f"Response cache: {response_cache.stats()}")
+        logger.info(f"LLM client: {config.client.stats}")
+        state_journal.compact()
+        logger.info(f"Run {state_journal.RUN_ID} metrics:\n" + metrics.summary())
+        metrics.export(args.metrics_json, args.metrics_prom)
+        logger.info("Prompt tokens:\n" + token_ledger.summary())
+
+        if scheduler.errors:
+            logger.error(f"{len(scheduler.errors)} stage(s) did not complete: {', '.join(scheduler.errors)}")
             sys.exit(1)
 
     except Exception as e:
@@ -0,0 +1,165 @@
+import re
+import json
+import math
+import threading
+from logger import setup_logger
+
+# Initialize logger
+logger = setup_logger('PromptBuilder', 'project_initializer.log')
+
+DEFAULT_TOKEN_BUDGET = 12000
+
+# Pruning steps, applied to the lowest-priority section first: strings are
+# shortened to each length in turn, then containers below each depth are
+# replaced by a one-line summary
+STRING_LIMITS = (400, 200, 100, 48)
+DEPTH_LIMITS = (6, 4, 3, 2)
+LIST_KEEP = 3
+
+_WORD_PIECE = re.compile(r"\w+|[^\w\s]")
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def _tiktoken_encoding():
+    """The model's tokenizer when tiktoken is installed, otherwise False."""
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding("o200k_base")
+                except Exception:
+                    _encoding = False
+    return _encoding
+
+
+def count_tokens(text):
+    """
+    Token count for `text`. Uses tiktoken when available; otherwise a local
+    estimate (one token per punctuation mark, about four characters per word
+    piece) that tracks BPE counts for JSON closely enough to enforce a budget.
+    """
+    encoding = _tiktoken_encoding()
+    if encoding:
+        return len(encoding.encode(text))
+    return sum(math.ceil(len(piece) / 4) for piece in _WORD_PIECE.findall(text))
+
+
+def compact_json(data):
+    """Minified JSON; plain strings are embedded as they are."""
+    if isinstance(data, str):
+        return data
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+
+
+def _shorten_strings(data, limit):
+    if isinstance(data, str):
+        if len(data) <= limit:
+            return data
+        return data[:limit].rstrip() + f"…(+{len(data) - limit} chars)"
+    if isinstance(data, dict):
+        return {key: _shorten_strings(value, limit) for key, value in data.items()}
+    if isinstance(data, list):
+        return [_shorten_strings(value, limit) for value in data]
+    return data
+
+
+def _collapse(data, depth):
+    """Replace containers nested deeper than `depth` with a summary of what was dropped."""
+    if isinstance(data, dict):
+        if depth <= 0:
+            keys = list(data)
+            shown = ", ".join(keys[:LIST_KEEP])
+            more = f", +{len(keys) - LIST_KEEP} more" if len(keys) > LIST_KEEP else ""
+            return f"{{{shown}{more}}}"
+        return {key: _collapse(value, depth - 1) for key, value in data.items()}
+    if isinstance(data, list):
+        if depth <= 0:
+            return f"[{len(data)} items]"
+        return [_collapse(value, depth - 1) for value in data]
+    return data
+
+
+class PromptSection:
+    """A JSON document embedded in a prompt. Higher priority sections are pruned last."""
+
+    def __init__(self, label, data, priority=0):
+        self.label = label
+        self.data = data
+        self.priority = priority
+        self.text = compact_json(data)
+        self.tokens = count_tokens(self.text)
+        self.pruned = None
+
+    def _set(self, data, pruned):
+        self.text = compact_json(data)
+        self.tokens = count_tokens(self.text)
+        self.pruned = pruned
+
+    def reductions(self):
+        """Progressively smaller versions of the section, least lossy first."""
+        for limit in STRING_LIMITS:
+            yield _shorten_strings(self.data, limit), f"strings > {limit} chars shortened"
+        shortened = _shorten_strings(self.data, STRING_LIMITS[-1])
+        for depth in DEPTH_LIMITS:
+            yield _collapse(shortened, depth), f"strings shortened, subtrees below depth {depth} summarized"
+
+
+def build_sections(sections, budget=DEFAULT_TOKEN_BUDGET):
+    """
+    Serialize `sections` compactly and, if together they exceed `budget`
+    tokens, prune the lowest-priority sections until they fit or nothing
+    more can be removed. A falsy budget disables pruning.
+    Returns {label: text}.
+    """
+    def total():
+        return sum(section.tokens for section in sections)
+
+    if budget:
+        for section in sorted(sections, key=lambda s: s.priority):
+            if total() <= budget:
+                break
+            for data, description in section.reductions():
+                section._set(data, description)
+                if total() <= budget:
+                    break
+        if total() > budget:
+            logger.warning(f"Prompt is {total()} tokens after pruning, over the budget of {budget}.")
+    for section in sections:
+        if section.pruned:
+            logger.info(f"Prompt section {section.label}: {section.pruned} ({section.tokens} tokens).")
+    return {section.label: section.text for section in sections}
+
+
+class TokenLedger:
+    """Per-stage prompt sizes: what the indent=4 prompt would have cost versus what was sent."""
+
+    def __init__(self):
+        self.entries = []
+        self._lock = threading.Lock()
+
+    def record(self, stage, baseline_tokens, sent_tokens):
+        with self._lock:
+            self.entries.append({"stage": stage, "baseline": baseline_tokens, "sent": sent_tokens,
+                                 "saved": baseline_tokens - sent_tokens})
+        logger.info(f"{stage} prompt: {sent_tokens} tokens sent, {baseline_tokens - sent_tokens} saved "
+                    f"({baseline_tokens} with indented JSON).")
+
+    def summary(self):
+        with self._lock:
+            entries = list(self.entries)
+        lines = [f"{'stage':<32} {'baseline':>9} {'sent':>9} {'saved':>9}"]
+        for entry in entries:
+            lines.append(f"{entry['stage']:<32} {entry['baseline']:>9} {entry['sent']:>9} {entry['saved']:>9}")
+        baseline = sum(entry["baseline"] for entry in entries)
+        saved = sum(entry["saved"] for entry in entries)
+        percent = 100 * saved / baseline if baseline else 0
+        lines.append(f"{'total':<32} {baseline:>9} {baseline - saved:>9} {saved:>9} ({percent:.0f}%)")
+        return "\n".join(lines)
+
+
+def indented_tokens(data):
+    """Token count of `data` the way prompts used to embed it (json.dumps indent=4)."""
+    return count_tokens(data if isinstance(data, str) else json.dumps(data, indent=4))
@@ -0,0 +1,272 @@
+import re
+import json
+import hashlib
+import threading
+from pathlib import Path
+from logger import setup_logger
+
+# Initialize logger
+logger = setup_logger('SchemaRegistry', 'project_initializer.log')
+
+_validators = {}
+_validators_by_id = {}
+_schema_files = {}
+_lock = threading.Lock()
+
+
+def __getattr__(name):
+    # jsonschema is imported on first use so importing this module stays cheap
+    if name in ('ValidationError', 'SchemaError'):
+        from jsonschema import exceptions
+        return getattr(exceptions, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def unwrap_schema(document):
+    """
+    Return the JSON Schema inside an OpenAI `json_schema` response_format
+    wrapper ({"name": ..., "strict": ..., "schema": {...}}), or the document
+    itself if it is already a bare schema.
+    """
+    if isinstance(document, dict) and isinstance(document.get('schema'), dict) and 'name' in document:
+        return document['schema']
+    return document
+
+
+def schema_hash(schema):
+    canonical = json.dumps(schema, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def get_validator(schema):
+    """
+    Return a compiled Draft 2020-12 validator for `schema`.
+    The schema is checked and compiled once per distinct content hash; local
+    `$defs`/`$ref` pointers are resolved against the schema itself.
+    """
+    # Fast path: the same schema object is passed on every call in a bulk run
+    cached = _validators_by_id.get(id(schema))
+    if cached is not None and cached[0] is schema:
+        return cached[1]
+    from jsonschema import Draft202012Validator
+    document = schema
+    schema = unwrap_schema(schema)
+    key = schema_hash(schema)
+    with _lock:
+        validator = _validators.get(key)
+        if validator is None:
+            Draft202012Validator.check_schema(schema)
+            validator = Draft202012Validator(schema)
+            _validators[key] = validator
+            logger.debug(f"Compiled validator {key[:12]}")
+        # Holding a reference to the document keeps its id() from being reused
+        _validators_by_id[id(document)] = (document, validator)
+    return validator
+
+
+def load_schema_file(path):
+    """Load a schema file, re-reading it only when its size or mtime changes."""
+    path = Path(path)
+    st = path.stat()
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _schema_files.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    with open(path, 'r') as f:
+        schema = unwrap_schema(json.load(f))
+    _schema_files[path] = (stamp, schema)
+    return schema
+
+
+def first_error(instance, schema):
+    """Fail-first check: return the first validation error found, or None."""
+    return next(get_validator(schema).iter_errors(instance), None)
+
+
+def collect_errors(instance, schema):
+    """Collect-all check: return every validation error, ordered by location."""
+    return sorted(get_validator(schema).iter_errors(instance), key=lambda e: [str(p) for p in e.absolute_path])
+
+
+def check(instance, schema, collect_all=False):
+    """
+    Validate `instance` and raise ValidationError on failure.
+    In fail-first mode the first error is raised as soon as it is found. In
+    collect-all mode every error is gathered, attached as `all_errors`, and
+    the most relevant one is raised.
+    """
+    if not collect_all:
+        error = first_error(instance, schema)
+        if error is not None:
+            raise error
+        return
+    errors = collect_errors(instance, schema)
+    if errors:
+        from jsonschema.exceptions import best_match
+        error = best_match(errors)
+        error.all_errors = errors
+        raise error
+
+
+def validate_many(instances, schema, collect_all=False):
+    """
+    Validate many documents against one compiled schema.
+    Returns a list of (index, [errors]) for the documents that failed.
+    """
+    validator = get_validator(schema)
+    failures = []
+    for index, instance in enumerate(instances):
+        if collect_all:
+            errors = list(validator.iter_errors(instance))
+        else:
+            error = next(validator.iter_errors(instance), None)
+            errors = [error] if error is not None else []
+        if errors:
+            failures.append((index, errors))
+    return failures
+
+
+# Keywords strict structured outputs rejects. They are dropped from the schema
+# sent to the API only; responses are still validated against the full schema.
+STRICT_UNSUPPORTED = frozenset({
+    "$schema", "$id", "default", "examples", "format", "pattern", "minLength", "maxLength",
+    "minimum", "maximum", "exclusiveMinimum", "exclusiveMaximum", "multipleOf",
+    "minItems", "maxItems", "uniqueItems", "contains", "minContains", "maxContains",
+    "minProperties", "maxProperties", "patternProperties", "propertyNames",
+    "unevaluatedProperties", "unevaluatedItems", "dependentRequired", "dependentSchemas",
+})
+STRICT_MAX_DEPTH = 10
+
+_strict_schemas = {}
+
+
+class StrictSchemaError(ValueError):
+    """The schema cannot be expressed in strict structured-output mode."""
+
+
+def _nullable(schema):
+    """`schema` widened to also accept null (strict mode's spelling of an optional property)."""
+    schema_type = schema.get('type')
+    if schema_type is not None and 'enum' not in schema and 'const' not in schema:
+        types = schema_type if isinstance(schema_type, list) else [schema_type]
+        return dict(schema, type=types if 'null' in types else types + ['null'])
+    if 'anyOf' in schema:
+        return dict(schema, anyOf=schema['anyOf'] + [{"type": "null"}])
+    return {"anyOf": [schema, {"type": "null"}]}
+
+
+def _to_strict(schema, path, depth):
+    if not isinstance(schema, dict):
+        raise StrictSchemaError(f"{path}: boolean schemas are not supported")
+    for keyword in ('allOf', 'not', 'if', 'then', 'else'):
+        if keyword in schema:
+            raise StrictSchemaError(f"{path}: '{keyword}' is not supported")
+    schema_type = schema.get('type')
+    types = schema_type if isinstance(schema_type, list) else [schema_type]
+    strict = {key: value for key, value in schema.items() if key not in STRICT_UNSUPPORTED}
+
+    if 'oneOf' in strict:
+        strict['anyOf'] = strict.pop('oneOf')
+    if 'anyOf' in strict:
+        strict['anyOf'] = [_to_strict(option, f"{path}/anyOf/{index}", depth)
+                           for index, option in enumerate(strict['anyOf'])]
+    for keyword in ('$defs', 'definitions'):
+        if keyword in strict:
+            strict[keyword] = {name: _to_strict(definition, f"{path}/{keyword}/{name}", depth)
+                               for name, definition in strict[keyword].items()}
+
+    if 'object' in types or 'properties' in schema:
+        depth += 1
+        if depth > STRICT_MAX_DEPTH:
+            raise StrictSchemaError(f"{path}: objects are nested more than {STRICT_MAX_DEPTH} levels deep")
+        properties = schema.get('properties') or {}
+        if not properties and schema.get('additionalProperties') is not False:
+            raise StrictSchemaError(f"{path}: free-form objects (no 'properties') are not supported")
+        required = set(schema.get('required', []))
+        strict['properties'] = {}
+        for name, subschema in properties.items():
+            converted = _to_strict(subschema, f"{path}/{name}", depth)
+            strict['properties'][name] = converted if name in required else _nullable(converted)
+        # Every property must be listed as required; optional ones were made nullable above
+        strict['required'] = list(properties)
+        strict['additionalProperties'] = False
+    if 'array' in types:
+        items = schema.get('items')
+        if not isinstance(items, dict):
+            raise StrictSchemaError(f"{path}: arrays need a single 'items' schema")
+        strict['items'] = _to_strict(items, f"{path}/items", depth)
+    return strict
+
+
+def strict_schema(schema):
+    """
+    Return a copy of `schema` normalized for strict structured outputs: every
+    object closed with additionalProperties: false and all of its properties
+    required (optional ones become nullable), oneOf spelled anyOf, and the
+    keywords strict mode rejects removed. Memoized by content hash.
+    Raises StrictSchemaError for schemas strict mode cannot express.
+    """
+    schema = unwrap_schema(schema)
+    key = schema_hash(schema)
+    with _lock:
+        cached = _strict_schemas.get(key)
+    if cached is not None:
+        return cached
+    if not schema or schema.get('type') != 'object' or 'anyOf' in schema or 'oneOf' in schema:
+        raise StrictSchemaError("the root must be a plain object schema")
+    strict = _to_strict(schema, "#", 0)
+    with _lock:
+        _strict_schemas[key] = strict
+    return strict
+
+
+def response_format(name, schema):
+    """
+    The response_format to request a document matching `schema` with: a strict
+    json_schema when the schema allows it, a non-strict json_schema when it
+    does not, and plain JSON mode for an empty (accept-all) schema.
+    """
+    schema = unwrap_schema(schema)
+    if not schema:
+        return {"type": "json_object"}
+    name = re.sub(r'[^A-Za-z0-9_-]', '_', name)[:64]
+    try:
+        return {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": strict_schema(schema)}}
+    except StrictSchemaError as e:
+        logger.warning(f"Schema {name} cannot be used in strict mode ({e}); requesting it without strict.")
+        return {"type": "json_schema", "json_schema": {"name": name, "strict": False, "schema": schema}}
+
+
+def drop_null_optionals(instance, schema):
+    """
+    Remove null values that strict mode returned for optional properties the
+    original schema does not allow to be null, so the document validates
+    against that schema. Modifies and returns `instance`.
+    """
+    schema = unwrap_schema(schema)
+    if not isinstance(schema, dict):
+        return instance
+    if isinstance(instance, dict) and 'properties' in schema:
+        required = set(schema.get('required', []))
+        for name, subschema in schema['properties'].items():
+            if name not in instance:
+                continue
+            if instance[name] is None and name not in required and not _accepts_null(subschema):
+                del instance[name]
+            else:
+                drop_null_optionals(instance[name], subschema)
+    elif isinstance(instance, list) and isinstance(schema.get('items'), dict):
+        for item in instance:
+            drop_null_optionals(item, schema['items'])
+    return instance
+
+
+def _accepts_null(schema):
+    if not isinstance(schema, dict) or not schema:
+        return True
+    schema_type = schema.get('type')
+    if schema_type == 'null' or (isinstance(schema_type, list) and 'null' in schema_type):
+        return True
+    if None in schema.get('enum', ()):
+        return True
+    return any(_accepts_null(option) for option in schema.get('anyOf', []) + schema.get('oneOf', []))
@@ -0,0 +1,82 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from logger import setup_logger
+
+# Initialize logger
+logger = setup_logger('Speculative', 'project_initializer.log')
+
+_local = threading.local()
+
+
+class CandidateCancelled(Exception):
+    """Raised inside a candidate once another candidate has won."""
+
+
+def current():
+    """The Speculation the calling thread is running a candidate for, or None."""
+    return getattr(_local, 'speculation', None)
+
+
+def check_cancelled():
+    """Raise CandidateCancelled if the calling thread's candidate lost the race. A no-op outside a speculation."""
+    speculation = current()
+    if speculation is not None and speculation.done.is_set():
+        raise CandidateCancelled()
+
+
+class Speculation:
+    """
+    Run several candidates for the same result concurrently and keep the first
+    one that succeeds.
+
+    Each candidate runs on its own thread; `attempt(index)` returns a result or
+    raises when the candidate is unusable. When one succeeds the others are
+    cancelled: those not started are never run, and running ones stop at their
+    next check_cancelled() (a streamed completion checks between chunks; a
+    request already sent without streaming is left to finish and discarded).
+    If every candidate fails, the first error is raised.
+    """
+
+    def __init__(self, candidates, label="speculation"):
+        self.candidates = max(1, candidates)
+        self.label = label
+        self.done = threading.Event()
+        self.winner = None
+        self.failed = 0
+        self.cancelled = 0
+
+    def _attempt(self, attempt, index):
+        _local.speculation = self
+        try:
+            check_cancelled()
+            return attempt(index)
+        finally:
+            _local.speculation = None
+
+    def run(self, attempt):
+        start = time.perf_counter()
+        pool = ThreadPoolExecutor(max_workers=self.candidates, thread_name_prefix='candidate')
+        futures = {pool.submit(self._attempt, attempt, index): index for index in range(self.candidates)}
+        errors = []
+        try:
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except CandidateCancelled:
+                    self.cancelled += 1
+                    continue
+                except Exception as e:
+                    self.failed += 1
+                    errors.append(e)
+                    logger.info(f"{self.label}: candidate {futures[future] + 1}/{self.candidates} rejected: {e}")
+                    continue
+                self.winner = futures[future]
+                self.cancelled = self.candidates - self.failed - 1
+                logger.info(f"{self.label}: candidate {self.winner + 1}/{self.candidates} won after "
+                            f"{time.perf_counter() - start:.2f}s ({self.failed} rejected, {self.cancelled} cancelled)")
+                return result
+            raise errors[0]
+        finally:
+            self.done.set()
+            pool.shutdown(wait=False, cancel_futures=True)
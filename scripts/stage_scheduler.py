@@ -0,0 +1,156 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from logger import setup_logger
+
+# Initialize logger
+logger = setup_logger('StageScheduler', 'project_initializer.log')
+
+
+class Stage:
+    """
+    A single unit of work in the initialization pipeline.
+
+    `func` is called with a dict mapping each dependency name to the value
+    that dependency returned. Stage names must be unique within a scheduler
+    run; use the project prefix (e.g. 'apps/crossword:models') to keep them
+    apart when several projects are scheduled together.
+    """
+
+    def __init__(self, name, func, depends_on=(), project=None):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+        self.project = project
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, depends_on={list(self.depends_on)})"
+
+
+class StageScheduler:
+    """
+    Run a DAG of stages on a bounded thread pool.
+
+    Every stage whose dependencies have succeeded is submitted as soon as a
+    worker is free, so independent stages (and independent projects) overlap
+    while `max_workers` caps the number of in-flight LLM requests. When a
+    stage fails, everything downstream of it is skipped; unrelated branches
+    keep running.
+    """
+
+    def __init__(self, stages, max_workers=4):
+        self.stages = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage name: {stage.name}")
+            self.stages[stage.name] = stage
+        for stage in self.stages.values():
+            for dep in stage.depends_on:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage {stage.name} depends on unknown stage {dep}")
+        self._check_acyclic()
+        self.max_workers = max(1, int(max_workers))
+        self.results = {}
+        self.errors = {}
+        self.timings = []
+        self.total_seconds = None
+        self._last_elapsed = {}
+        self._lock = threading.Lock()
+
+    def _check_acyclic(self):
+        """Raise ValueError if the dependency graph contains a cycle."""
+        visiting, done = set(), set()
+
+        def visit(name, path):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle detected: {' -> '.join(path + [name])}")
+            visiting.add(name)
+            for dep in self.stages[name].depends_on:
+                visit(dep, path + [name])
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.stages:
+            visit(name, [])
+
+    def _run_stage(self, stage):
+        inputs = {dep: self.results[dep] for dep in stage.depends_on}
+        start = time.perf_counter()
+        try:
+            return stage.func(inputs)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._last_elapsed[stage.name] = elapsed
+
+    def _record(self, stage, status, seconds):
+        self.timings.append({
+            "project": stage.project,
+            "stage": stage.name,
+            "status": status,
+            "seconds": round(seconds, 3)
+        })
+
+    def run(self):
+        """
+        Execute all stages and return a dict of stage name -> result.
+        Failed stages are listed in `self.errors`; per-stage latency in `self.timings`.
+        """
+        self._last_elapsed = {}
+        pending = dict(self.stages)
+        running = {}
+        run_start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending or running:
+                # Skip stages whose dependencies failed or were skipped
+                blocked = [name for name, stage in pending.items()
+                           if any(dep in self.errors for dep in stage.depends_on)]
+                for name in blocked:
+                    stage = pending.pop(name)
+                    failed = [dep for dep in stage.depends_on if dep in self.errors]
+                    self.errors[name] = RuntimeError(f"Skipped because {', '.join(failed)} did not complete")
+                    self._record(stage, 'Skipped', 0.0)
+                    logger.warning(f"Skipping stage {name}: upstream {', '.join(failed)} failed")
+                if blocked:
+                    continue
+
+                # Submit every stage whose dependencies are satisfied
+                ready = [name for name, stage in pending.items()
+                         if all(dep in self.results for dep in stage.depends_on)]
+                for name in ready:
+                    stage = pending.pop(name)
+                    logger.debug(f"Submitting stage {name}")
+                    running[pool.submit(self._run_stage, stage)] = stage
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    elapsed = self._last_elapsed.get(stage.name, 0.0)
+                    try:
+                        self.results[stage.name] = future.result()
+                        self._record(stage, 'Success', elapsed)
+                        logger.info(f"Stage {stage.name} finished in {elapsed:.2f}s")
+                    except Exception as e:
+                        self.errors[stage.name] = e
+                        self._record(stage, 'Failed', elapsed)
+                        logger.error(f"Stage {stage.name} failed after {elapsed:.2f}s: {e}")
+
+        self.total_seconds = time.perf_counter() - run_start
+        return self.results
+
+
+def format_latency_report(timings, total_seconds=None):
+    """Render per-stage latency as a fixed-width table for the log."""
+    lines = [f"{'stage':<40} {'status':<8} {'seconds':>8}"]
+    for entry in sorted(timings, key=lambda t: t['seconds'], reverse=True):
+        lines.append(f"{entry['stage']:<40} {entry['status']:<8} {entry['seconds']:>8.2f}")
+    if total_seconds is not None:
+        serial = sum(t['seconds'] for t in timings)
+        lines.append(f"wall clock {total_seconds:.2f}s, serial sum {serial:.2f}s")
+    return "\n".join(lines)
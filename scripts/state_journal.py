@@ -0,0 +1,143 @@
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from atomic_write import atomic_open
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are still serialized within the process
+    fcntl = None
+
+JOURNAL_PATH = 'state_report.jsonl'
+REPORT_PATH = 'state_report.json'
+
+# Identifies every entry written by this process
+RUN_ID = uuid.uuid4().hex[:12]
+
+_lock = threading.Lock()
+
+
+@contextmanager
+def _locked(f, exclusive=True):
+    """Hold an flock on an open file (and the process-wide lock) for the duration of the block."""
+    with _lock:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield f
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _legacy_lines(report_path):
+    """Entries of a state_report.json written before the journal existed, as journal lines."""
+    try:
+        with open(report_path, 'r') as f:
+            entries = json.load(f)
+    except (OSError, ValueError):
+        return []
+    if not isinstance(entries, list):
+        return []
+    return [json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries if isinstance(entry, dict)]
+
+
+def append(entry, journal_path=JOURNAL_PATH, report_path=REPORT_PATH):
+    """
+    Append one entry to the journal as a single JSON line, stamped with the
+    time and this process's run id. Appends are O(1) and serialized with an
+    exclusive file lock, so concurrent pipelines can share one journal. The
+    first append imports any legacy state_report.json so no history is lost.
+    """
+    record = {"time": time.strftime('%Y-%m-%dT%H:%M:%S%z'), "run_id": RUN_ID}
+    record.update(entry)
+    line = json.dumps(record, ensure_ascii=False) + "\n"
+    journal_path = Path(journal_path)
+    with open(journal_path, 'a', encoding='utf-8') as f:
+        with _locked(f):
+            if os.fstat(f.fileno()).st_size == 0 and Path(report_path).is_file():
+                f.writelines(_legacy_lines(report_path))
+            f.write(line)
+            f.flush()
+    return record
+
+
+def read_entries(journal_path=JOURNAL_PATH):
+    """All journal entries in order. A torn final line (from a crash mid-write) is skipped."""
+    entries = []
+    try:
+        f = open(journal_path, 'r', encoding='utf-8')
+    except FileNotFoundError:
+        return entries
+    with f, _locked(f, exclusive=False):
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+    return entries
+
+
+def latest_by_file(entries):
+    """The most recent entry for each file, in order of first appearance."""
+    latest = {}
+    for entry in entries:
+        latest[entry.get('file')] = entry
+    return list(latest.values())
+
+
+def compact(journal_path=JOURNAL_PATH, report_path=REPORT_PATH, latest=False):
+    """
+    Regenerate the state_report.json view from the journal (every entry, or
+    only the latest per file) and write it atomically. Returns the entries written.
+    """
+    entries = read_entries(journal_path)
+    if not entries and not Path(journal_path).is_file():
+        return None
+    if latest:
+        entries = latest_by_file(entries)
+    with atomic_open(report_path) as f:
+        json.dump(entries, f, indent=4, ensure_ascii=False)
+    return entries
+
+
+def summarize(entries):
+    """Per-run counts of each status and total stage time, oldest run first."""
+    runs = {}
+    for entry in entries:
+        run = runs.setdefault(entry.get('run_id') or 'legacy', {"started": entry.get('time'), "statuses": {}, "seconds": 0.0})
+        status = entry.get('status', 'Unknown')
+        run["statuses"][status] = run["statuses"].get(status, 0) + 1
+        run["seconds"] += entry.get('duration') or 0.0
+    lines = []
+    for run_id, run in runs.items():
+        counts = ", ".join(f"{status}: {count}" for status, count in sorted(run["statuses"].items()))
+        lines.append(f"{run_id:<14} {run['started'] or '-':<26} {run['seconds']:8.2f}s  {counts}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compact or summarize the state report journal.")
+    parser.add_argument('command', choices=['compact', 'summary'])
+    parser.add_argument('--journal', default=JOURNAL_PATH, help="Journal file (JSON lines)")
+    parser.add_argument('--report', default=REPORT_PATH, help="state_report.json view to regenerate")
+    parser.add_argument('--latest', action='store_true', help="Keep only the latest entry per file in the view")
+    args = parser.parse_args(argv)
+
+    if args.command == 'compact':
+        entries = compact(args.journal, args.report, latest=args.latest)
+        if entries is None:
+            print(f"{args.journal} does not exist.", file=sys.stderr)
+            sys.exit(1)
+        print(f"Wrote {len(entries)} entries to {args.report}")
+    else:
+        print(summarize(read_entries(args.journal)))
+
+if __name__ == "__main__":
+    main()
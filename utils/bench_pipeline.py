@@ -0,0 +1,146 @@
+import os
+import sys
+import time
+import shutil
+import logging
+import argparse
+import resource
+import tempfile
+from pathlib import Path
+
+# The pipeline lives in scripts/
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "scripts"))
+
+# Structure to answer with when structure.json holds no schema
+STRUCTURE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "lib": {
+            "type": "object",
+            "properties": {
+                "main.dart": {"type": "string"},
+                "authBloc": {"type": "array", "items": {"type": "string"}},
+                "screens": {"type": "array", "items": {"type": "string"}},
+                "widgets": {"type": "array", "items": {"type": "string"}},
+            },
+        }
+    },
+}
+
+# Phrases from each generator's system prompt, used to route stand-in responses
+STAGE_MARKERS = {
+    "structure.json": "'app/lib' folder",
+    "models.json": "'model' set",
+    "other_values.json": "non-model values",
+}
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def build_projects(root, count, subject_file):
+    """Lay out <root>/project_N/alignment_files/subject.json."""
+    projects = []
+    for index in range(count):
+        project = root / f"project_{index}"
+        (project / "alignment_files").mkdir(parents=True)
+        shutil.copy(subject_file, project / "alignment_files" / "subject.json")
+        projects.append(project.name)
+    return projects
+
+
+def report(scheduler, elapsed, project_count, standin, client, rss_before):
+    ran = [timing for timing in scheduler.timings if timing['status'] != 'Skipped']
+    completed = {timing['project'] for timing in scheduler.timings} - {
+        timing['project'] for timing in scheduler.timings if timing['status'] != 'Success'}
+    print(f"Projects: {project_count} ({len(completed)} completed), stages run: {len(ran)}, "
+          f"failed or skipped: {len(scheduler.errors)}")
+    print(f"Wall time: {elapsed:.2f}s  throughput: {len(completed) / elapsed:.2f} projects/s, {len(ran) / elapsed:.2f} stages/s")
+    print(f"\n{'stage':<18} {'runs':>5} {'p50':>8} {'p99':>8} {'max':>8}")
+    by_stage = {}
+    for timing in ran:
+        by_stage.setdefault(timing['stage'].rsplit(':', 1)[-1], []).append(timing['seconds'])
+    for stage, seconds in by_stage.items():
+        print(f"{stage:<18} {len(seconds):>5} {percentile(seconds, 0.5):>7.3f}s {percentile(seconds, 0.99):>7.3f}s {max(seconds):>7.3f}s")
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"\nPeak RSS: {rss_after / 1024:.1f} MB ({(rss_after - rss_before) / 1024:+.1f} MB during the run)")
+    print(f"Stand-in: {standin.stats}")
+    print(f"Client:   {client.stats}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the project_initializer pipeline against an offline LLM stand-in.")
+    parser.add_argument('--projects', type=int, default=20, help="Number of projects to initialize")
+    parser.add_argument('--max-workers', type=int, default=8, help="Stages in flight at once")
+    parser.add_argument('--latency', type=float, default=0.05, help="Mean stand-in response latency in seconds")
+    parser.add_argument('--jitter', type=float, default=0.02, help="Uniform +/- latency jitter in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with 429/5xx")
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help="Fraction of responses with broken JSON")
+    parser.add_argument('--stream', action='store_true', help="Use streamed completions with incremental validation")
+    parser.add_argument('--candidates', type=int, default=1, help="Completions raced per stage (first valid wins)")
+    parser.add_argument('--chunk-delay', type=float, default=0.0, help="Seconds between streamed chunks")
+    parser.add_argument('--replay-cache', help="Replay responses recorded in this llm_cache directory where possible")
+    parser.add_argument('--subject', default=str(REPO_ROOT / "alignment_files" / "subject.json"), help="subject.json used for every project")
+    parser.add_argument('--schema-dir', default=str(REPO_ROOT / "schemas"), help="Directory holding the stage schemas")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--verbose', action='store_true', help="Show pipeline logging")
+    args = parser.parse_args(argv)
+
+    subject_file = Path(args.subject).resolve()
+    schema_dir = Path(args.schema_dir).resolve()
+    replay_cache = Path(args.replay_cache).resolve() if args.replay_cache else None
+    if not args.verbose:
+        logging.disable(logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        projects = build_projects(root, args.projects, subject_file)
+        # Logs, the state report and checkpoints are written relative to the working directory
+        previous_cwd = os.getcwd()
+        os.chdir(root)
+        try:
+            import project_initializer
+            import llm_client
+            from llm_cache import ResponseCache
+            from stage_scheduler import StageScheduler
+            from llm_standin import LLMStandIn, schema_responder, replay_responder
+
+            config = project_initializer.config
+            config.schema_dir = schema_dir
+            routes = [(marker, config.schema(name) or (STRUCTURE_SCHEMA if name == "structure.json" else {}))
+                      for name, marker in STAGE_MARKERS.items()]
+            responder = schema_responder(routes, seed=args.seed)
+            if replay_cache is not None:
+                responder = replay_responder(replay_cache, fallback=responder)
+            standin = LLMStandIn(responder, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                                 malformed_rate=args.malformed_rate, chunk_delay=args.chunk_delay, seed=args.seed)
+            client = llm_client.set_shared_client(llm_client.LLMClient(
+                requests_per_minute=10 ** 6, tokens_per_minute=10 ** 9, max_concurrency=args.max_workers * args.candidates,
+                base_delay=0.05, max_delay=1.0, openai_client=standin))
+            project_initializer.response_cache = ResponseCache(enabled=False)
+            config.stream = args.stream
+            config.candidates = args.candidates
+
+            stages = []
+            for project in projects:
+                stages.extend(project_initializer.build_project_stages(project))
+            scheduler = StageScheduler(stages, max_workers=args.max_workers)
+
+            rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            start = time.perf_counter()
+            scheduler.run()
+            elapsed = time.perf_counter() - start
+            report(scheduler, elapsed, len(projects), standin, client, rss_before)
+        finally:
+            # Flush the background log writers before the temp directory goes away
+            import logger
+            logger.stop_listeners()
+            os.chdir(previous_cwd)
+
+if __name__ == "__main__":
+    main()
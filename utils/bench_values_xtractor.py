@@ -0,0 +1,184 @@
+import os
+import re
+import time
+import random
+import argparse
+import tempfile
+from pathlib import Path
+
+import values_xtractor
+import dart_lexer
+
+
+# Reference implementation: the original per-pattern regex scanner
+def legacy_parse(content, file_name, model_values, non_model_values):
+    imported_packages = re.findall(r"import '([^']+)';", content)
+    imported_classes = re.findall(r'import package:([^"]+)";', content)
+    non_model_values["imported_packages"].extend(imported_packages)
+    non_model_values["imported_classes"].extend(imported_classes)
+    re.findall(r'class (\w+)', content)
+    if "model" in file_name.lower():
+        fields = re.findall(r'final (\w+) (\w+);', content)
+        model_values[file_name] = {field[1]: field[0] for field in fields}
+    else:
+        non_model_values["event_names"].extend(re.findall(r'class (\w+Event)', content))
+        non_model_values["state_names"].extend(re.findall(r'class (\w+State)', content))
+        for function in re.findall(r'\w+ (\w+)\((.*)\)', content):
+            non_model_values["function_names"].append(function[0])
+            non_model_values["inputs_outputs"].append({"function_name": function[0], "parameters": function[1]})
+
+
+def empty_non_model_values():
+    return {key: [] for key in values_xtractor.non_model_values}
+
+
+# Synthetic Dart corpus
+def model_source(index, rng):
+    fields = "\n".join(f"  final {rng.choice(['int', 'String', 'bool', 'double'])} field{i};" for i in range(rng.randint(4, 20)))
+    return (
+        "import 'package:equatable/equatable.dart';\n"
+        "import 'package:json_annotation/json_annotation.dart';\n\n"
+        f"class Item{index}Model extends Equatable {{\n{fields}\n\n"
+        f"  const Item{index}Model();\n\n"
+        "  @override\n  List<Object?> get props => [];\n}\n"
+    )
+
+
+def bloc_source(index, rng):
+    handlers = "\n\n".join(
+        f"  void onAction{i}(String id, int count) {{\n    emit(Feature{index}State());\n  }}"
+        for i in range(rng.randint(5, 30))
+    )
+    return (
+        "import 'package:flutter_bloc/flutter_bloc.dart';\n"
+        f"import 'feature{index}_event.dart';\n"
+        f"import 'feature{index}_state.dart';\n\n"
+        f"abstract class Feature{index}Event {{}}\n"
+        f"class LoadFeature{index}Event extends Feature{index}Event {{}}\n"
+        f"class Feature{index}State {{}}\n"
+        f"class Feature{index}LoadingState extends Feature{index}State {{}}\n\n"
+        f"class Feature{index}Bloc extends Bloc<Feature{index}Event, Feature{index}State> {{\n"
+        f"{handlers}\n}}\n"
+    )
+
+
+def build_corpus(root, file_count, seed=0):
+    rng = random.Random(seed)
+    total_bytes = 0
+    for index in range(file_count):
+        folder = root / "lib" / f"feature_{index % 50}"
+        folder.mkdir(parents=True, exist_ok=True)
+        if index % 4 == 0:
+            path = folder / f"item{index}_model.dart"
+            source = model_source(index, rng)
+        else:
+            path = folder / f"feature{index}_bloc.dart"
+            source = bloc_source(index, rng)
+        path.write_text(source, encoding='utf-8')
+        total_bytes += len(source.encode('utf-8'))
+    return total_bytes
+
+
+# Inputs that make `\w+ (\w+)\((.*)\)` backtrack quadratically (many
+# call-like fragments on one line with no closing parenthesis), and ones
+# that would make the lexer's fast path rescan the file per match
+def adversarial_sources(size):
+    yield "unclosed calls", "void f() {\n  " + "a b(" * (size // 4) + "\n}\n"
+    yield "nested unclosed calls", "void f() { " + "a b((" * (size // 6) + "}\n"
+    yield "one long line", "void f() { " + "x y(1) + " * (size // 10) + "}\n"
+    yield "long string", "const s = '" + "class FakeEvent void g(int a) " * (size // 31) + "';\n"
+    yield "unclosed classes", "class Cn {\n" * (size // 11)
+    yield "final fields", "class A {\n" + "  final int f;\n" * (size // 15) + "}\n"
+    yield "qualified return types", "x.a b(" * (size // 6)
+
+
+# Fragments combined at random to check the lexer's fast path against its token path
+FUZZ_FRAGMENTS = [
+    "class A {", "class B extends C<D> {", "}", "{", "final int x;", "final Map<String, List<int>> m = {};",
+    "final f = (a) => a;", "void f(int a) {", "Future<void> g() async {", "x.y(z);", "return h(i);",
+    "set v(int q) {}", "static set w(String s) => 1;", "import 'a.dart' show P, Q;",
+    "import 'b.dart' if (dart.library.io) 'c.dart';", "// c ( { ;\n", "'str ( { ;'", '"s2 } )"',
+    "List<Foo>? k(", ")", "(", ";", "=>", "\n", "foo // x\n(a) {}", "Map<String, void Function(int)> handlers() {}",
+    "get x => 1;", "'unterminated\n", "int get(String k) => 1;", "static foo() {}", "a < b; c > q(x);",
+    "x ? y(z) : w;", "=> Text('a');", "class M = N with O;", "@override\n  Widget build(BuildContext context) {",
+    "a >= b(c) {", "List<int>f() {}", "Foo? bar() => null;", "prefix.Type fn() {}", "a.b c() {}", "1 foo() {}",
+    "final", "class", "import",
+]
+
+
+def fuzz_sources(count, seed=0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield rng.choice(["", " ", "\n"]).join(rng.choice(FUZZ_FRAGMENTS) for _ in range(rng.randint(1, 30)))
+
+
+def check_lexer_paths(sources):
+    """Assert that dart_lexer.parse() (fast path included) agrees with the full token parser. Returns the count checked."""
+    count = 0
+    for source in sources:
+        fast, full = dart_lexer.parse(source), dart_lexer._parse_tokens(source)
+        assert fast == full, f"lexer fast path disagrees with the token parser on {source[:80]!r}"
+        count += 1
+    return count
+
+
+def report(label, seconds, file_count, total_bytes):
+    print(f"{label:<28} {seconds:8.3f}s {file_count / seconds:12.0f} files/s {total_bytes / seconds / 1e6:10.2f} MB/s")
+
+
+def time_call(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark values_xtractor on a synthetic Dart corpus.")
+    parser.add_argument('--files', type=int, default=5000, help="Number of synthetic .dart files")
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count() or 1, help="Worker processes for the parallel run")
+    parser.add_argument('--adversarial-kb', type=int, default=64, help="Size of each adversarial input")
+    parser.add_argument('--fuzz', type=int, default=20000, help="Random fragment files checked against the token parser")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        total_bytes = build_corpus(root, args.files)
+        values_xtractor.base_path = root / "lib"
+        # Collect occurrence lists so counts are comparable with the regex scanner
+        values_xtractor.output_format = "lists"
+        paths = list(values_xtractor.base_path.rglob("*.dart"))
+        print(f"Corpus: {len(paths)} files, {total_bytes / 1e6:.2f} MB")
+
+        legacy_models, legacy_values = {}, empty_non_model_values()
+        start = time.perf_counter()
+        for path in paths:
+            with open(path, 'r') as f:
+                legacy_parse(f.read(), path.name, legacy_models, legacy_values)
+        report("regex (7 x findall)", time.perf_counter() - start, len(paths), total_bytes)
+
+        values_xtractor.reset_values()
+        start = time.perf_counter()
+        values_xtractor.scan_dart_files(jobs=1)
+        report("lexer, 1 job", time.perf_counter() - start, len(paths), total_bytes)
+        print(f"  functions found: regex {len(legacy_values['function_names'])}, "
+              f"lexer {len(values_xtractor.non_model_values['function_names'])}")
+
+        values_xtractor.reset_values()
+        start = time.perf_counter()
+        values_xtractor.scan_dart_files(jobs=args.jobs)
+        report(f"lexer, {args.jobs} jobs", time.perf_counter() - start, len(paths), total_bytes)
+
+        checked = check_lexer_paths(path.read_text(encoding='utf-8') for path in paths)
+        checked += check_lexer_paths(fuzz_sources(args.fuzz))
+        print(f"  fast path matches the token parser on {checked} files")
+
+    print(f"\nAdversarial single files ({args.adversarial_kb} KB each)")
+    for label, source in adversarial_sources(args.adversarial_kb * 1024):
+        check_lexer_paths([source])
+        regex_seconds = time_call(legacy_parse, source, "bloc.dart", {}, empty_non_model_values())
+        lexer_seconds = time_call(values_xtractor.extract_values, source, "bloc.dart")
+        tokens_seconds = time_call(dart_lexer._parse_tokens, source)
+        print(f"{label:<28} regex {regex_seconds:8.3f}s   lexer {lexer_seconds:8.3f}s   token path {tokens_seconds:8.3f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,618 @@
+import re
+import bisect
+from itertools import islice
+from collections import namedtuple
+
+# Bump when tokenization or extraction changes, so cached results are invalidated
+VERSION = 3
+
+Token = namedtuple("Token", "kind value start end")
+
+IDENT, STRING, NUMBER, PUNCT = "ident", "string", "number", "punct"
+
+# One alternative per token class, each preceded by the whitespace it skips.
+# Every branch is a literal or a single character-class run, so matching at
+# a position never backtracks further than the token it consumes. Plain
+# string literals (no escapes, no interpolation) are matched here directly;
+# everything else that opens a string is finished by hand in _tokenize.
+_TOKEN = re.compile(
+    r"\s*(?:"
+    r"(?P<line_comment>//[^\n]*)"
+    r"|(?P<block_comment>/\*)"
+    r"""|(?P<simple_string>'[^'\\\n$]*'(?!')|"[^"\\\n$]*"(?!"))"""
+    r"""|(?P<string>r?(?:'{3}|"{3}|'|"))"""
+    r"|(?P<ident>[A-Za-z_$][\w$]*)"
+    r"|(?P<number>0[xX][0-9a-fA-F]+|\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)"
+    r"|(?P<punct>=>|\?\?=|\?\?|\?\.|\.\.\.|\.\.|[-+*/%&|^<>=!~]=|[^\s])"
+    r"|(?P<end>\Z)"
+    r")"
+)
+
+_BLOCK_COMMENT_EDGE = re.compile(r"/\*|\*/")
+
+# Next character that can end or interrupt a string body
+_STRING_SPECIAL = {
+    "'": re.compile(r"[\\$'\n]"),
+    '"': re.compile(r'[\\$"\n]'),
+    "'''": re.compile(r"[\\$']"),
+    '"""': re.compile(r'[\\$"]'),
+}
+_RAW_STRING_END = {
+    "'": re.compile(r"['\n]"),
+    '"': re.compile(r'["\n]'),
+    "'''": re.compile(r"'''"),
+    '"""': re.compile(r'"""'),
+}
+
+# Words that can precede an identifier and "(" without it being a declaration
+KEYWORDS = frozenset((
+    "return", "await", "new", "const", "else", "throw", "yield", "case", "is",
+    "as", "in", "extends", "with", "implements", "factory", "if", "for",
+    "while", "switch", "catch", "do", "try", "finally", "assert", "super",
+    "this", "var", "final", "late", "rethrow", "on", "import", "export",
+    "part", "library", "show", "hide", "default", "break", "continue",
+    "static", "external", "operator",
+))
+
+# Tokens that may follow a parameter list in a function declaration
+_BODY_STARTS = frozenset(("{", "=>", "async", "sync", ";"))
+
+# Upper bound on how far a return type or field type is searched; keeps the
+# scan linear even on adversarial input
+MAX_TYPE_TOKENS = 64
+MAX_IMPORT_TOKENS = 256
+
+# Files containing none of these (block comments, interpolation, escapes,
+# multi-line and raw strings) take the fast path in parse()
+_NEEDS_TOKENIZER = ("/*", "${", "\\", "'''", '"""')
+_RAW_STRING = re.compile(r"""r(?<![\w$]r)['"]""")
+
+# Comments and strings of such a file, blanked out before it is searched
+_PLAIN_SKIP = re.compile(r"""//[^\n]*|'[^'\n]*'?|"[^"\n]*"?""")
+# Each search starts with a literal so the regex engine can skip ahead quickly
+_PLAIN_CLASS = re.compile(r"class(?<![\w$]class)\s+([A-Za-z_$][\w$]*)")
+_PLAIN_FINAL = re.compile(r"final(?<![\w$]final)(?![\w$])")
+_PLAIN_IMPORT = re.compile(r"import(?<![\w$]import)(?![\w$])")
+# `name(` and either a flat parameter list followed by a body, or a nested '(' to match by hand
+_PLAIN_CALL = re.compile(
+    r"[\s>?]([A-Za-z_$][\w$]*)\s*\("
+    r"(?:([^()]*)\)\s*(?:[{;]|=>|async(?![\w$])|sync(?![\w$]))|(?=[^()]*\())"
+)
+_PLAIN_SPACE = re.compile(r"\s")
+_IDENT_CHARS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_$")
+# _TOKEN for blanked-out text, which has no comments and only one-line strings
+_PLAIN_TOKEN = re.compile(
+    r"""(?P<string>'[^'\n]*'?|"[^"\n]*"?)"""
+    r"|(?P<ident>[A-Za-z_$][\w$]*)"
+    r"|(?P<number>0[xX][0-9a-fA-F]+|\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)"
+    r"|(?P<punct>=>|\?\?=|\?\?|\?\.|\.\.\.|\.\.|[-+*/%&|^<>=!~]=|[^\s])"
+)
+# A field declaration ends at its first ; = { } or ( token, and no later than the first of these
+_FIELD_STOP = re.compile(r"[;{}(]")
+_BRACES = re.compile(r"[{}]")
+_PARENS = re.compile(r"[()]")
+
+# Longest stretch of source tokenized to find one return type on the fast path
+MAX_WINDOW_CHARS = 2048
+# Characters the fast path may tokenize for return types, per character of
+# source, before it hands the file to _parse_tokens instead
+WINDOW_BUDGET = 2
+
+
+def _skip_block_comment(source, pos):
+    """`pos` is just past an opening /*. Dart block comments nest."""
+    depth = 1
+    while depth:
+        match = _BLOCK_COMMENT_EDGE.search(source, pos)
+        if match is None:
+            return len(source)
+        depth += 1 if match.group() == "/*" else -1
+        pos = match.end()
+    return pos
+
+
+def _scan_raw_string(source, pos, quote):
+    """`pos` is just past the opening quote of a raw string. Returns (end, body)."""
+    match = _RAW_STRING_END[quote].search(source, pos)
+    if match is None:
+        return len(source), source[pos:]
+    if match.group() == "\n":
+        return match.start(), source[pos:match.start()]
+    return match.end(), source[pos:match.start()]
+
+
+def _scan_string_body(source, pos, quote):
+    """
+    Scan a string body from `pos` to its closing quote or its next `${`.
+    Returns (position, body end, interpolating): past the closing quote and
+    where the body ends, or just past the `${` with interpolating=True.
+    """
+    special = _STRING_SPECIAL[quote]
+    while True:
+        match = special.search(source, pos)
+        if match is None:
+            return len(source), len(source), False
+        char = match.group()
+        at = match.start()
+        if char == "\\":
+            pos = at + 2
+        elif char == "$":
+            if source.startswith("${", at):
+                return at + 2, None, True
+            pos = at + 1
+        elif char == "\n":
+            # Unterminated single-line string: stop at the end of the line
+            return at, at, False
+        elif source.startswith(quote, at):
+            return at + len(quote), at, False
+        else:
+            pos = at + 1
+
+
+def _tokenize(source, pos, tokens):
+    """
+    Tokenize from `pos`, appending to `tokens` (or discarding when None).
+    Code inside `${...}` interpolations is scanned so its braces and quotes
+    cannot end the string early, but its tokens are not kept. Nesting is
+    tracked with an explicit stack rather than recursion, so adversarially
+    deep interpolations cannot exhaust the Python stack.
+    """
+    length = len(source)
+    # Strings suspended at a `${`, innermost last: (quote, token start, body start, enclosing brace depth)
+    suspended = []
+    depth = 0               # braces opened inside the innermost interpolation
+    string = None           # (quote, token start, body start) of the string body to scan next
+    while pos < length:
+        if string is not None:
+            quote, token_start, body_start = string
+            string = None
+            pos, body_end, interpolating = _scan_string_body(source, pos, quote)
+            if interpolating:
+                suspended.append((quote, token_start, body_start, depth))
+                depth = 0
+            elif tokens is not None and not suspended:
+                tokens.append(Token(STRING, source[body_start:body_end], token_start, pos))
+            continue
+        # finditer keeps the hot loop in C; it is restarted after any token
+        # that needs hand-written scanning (block comments, complex strings)
+        for match in _TOKEN.finditer(source, pos):
+            kind = match.lastgroup
+            if kind == "line_comment":
+                continue
+            if kind == "end":
+                pos = length
+                break
+            start = match.start(kind)
+            if kind == "block_comment":
+                pos = _skip_block_comment(source, match.end())
+                break
+            if kind == "string":
+                opener = match.group(kind)
+                quote = opener.lstrip("r")
+                if opener.startswith("r"):
+                    pos, body = _scan_raw_string(source, match.end(), quote)
+                    if tokens is not None and not suspended:
+                        tokens.append(Token(STRING, body, start, pos))
+                else:
+                    string = (quote, start, match.end())
+                    pos = match.end()
+                break
+            end = match.end()
+            if suspended:
+                if kind == PUNCT:
+                    value = match.group(kind)
+                    if value == "{":
+                        depth += 1
+                    elif value == "}":
+                        if depth == 0:
+                            # Back in the string this interpolation interrupted
+                            quote, token_start, body_start, depth = suspended.pop()
+                            string = (quote, token_start, body_start)
+                            pos = end
+                            break
+                        depth -= 1
+                continue
+            if tokens is None:
+                continue
+            if kind == "simple_string":
+                tokens.append(Token(STRING, source[start + 1:end - 1], start, end))
+            else:
+                tokens.append(Token(kind, match.group(kind), start, end))
+        else:
+            pos = length
+    if suspended and tokens is not None:
+        # The file ended inside an interpolation: the outermost string runs to the end
+        _, token_start, body_start, _ = suspended[0]
+        tokens.append(Token(STRING, source[body_start:], token_start, length))
+    return pos
+
+
+def tokenize(source):
+    """Return the significant tokens of a Dart source file (comments and whitespace dropped)."""
+    tokens = []
+    _tokenize(source, 0, tokens)
+    return tokens
+
+
+def _normalize(text):
+    return " ".join(text.split())
+
+
+def _match_parens(tokens):
+    """Map the index of every '(' to the index of its matching ')'."""
+    matches = {}
+    stack = []
+    for index, token in enumerate(tokens):
+        if token.kind != PUNCT:
+            continue
+        if token.value == "(":
+            stack.append(index)
+        elif token.value == ")" and stack:
+            matches[stack.pop()] = index
+    return matches
+
+
+def _return_type_start(tokens, name_index):
+    """
+    Walk back from a function name over its return type (`void`,
+    `Future<List<User>>?`, `prefix.Type`). Returns the index of the first
+    type token, or None if the name is not preceded by a type.
+    """
+    index = name_index - 1
+    floor = max(0, name_index - MAX_TYPE_TOKENS)
+    if index >= floor and tokens[index].value == "?":
+        index -= 1
+    if index >= floor and tokens[index].value == ">":
+        depth = 0
+        while index >= floor:
+            value = tokens[index].value
+            if value == ">":
+                depth += 1
+            elif value == "<":
+                depth -= 1
+                if depth == 0:
+                    break
+            elif value in (";", "{", "}"):
+                # A comparison in an earlier statement, not a type argument list
+                return None
+            index -= 1
+        else:
+            return None
+        index -= 1
+    if index < floor or tokens[index].kind != IDENT or tokens[index].value in KEYWORDS:
+        return None
+    while index - 2 >= floor and tokens[index - 1].value == "." and tokens[index - 2].kind == IDENT:
+        index -= 2
+    # `a.b(` inside an expression is a call, not a declaration
+    if index > 0 and tokens[index - 1].value in (".", "?.", ".."):
+        return None
+    return index
+
+
+def _declared_return_type(source, tokens, name_index):
+    """
+    Normalized return type of the function named by tokens[name_index], or
+    None if the name is not preceded by a type (a call). A setter is typed
+    by what precedes `set`, or void when nothing does.
+    """
+    type_end = name_index
+    setter = name_index > 0 and tokens[name_index - 1].kind == IDENT and tokens[name_index - 1].value == "set"
+    if setter:
+        type_end -= 1
+    type_start = _return_type_start(tokens, type_end)
+    if type_start is None:
+        if setter and (type_end == 0 or tokens[type_end - 1].value not in (".", "?.", "..")):
+            return "void"
+        return None
+    return _normalize(source[tokens[type_start].start:tokens[type_end].start])
+
+
+def _import_entry(tokens, index):
+    """`tokens[index]` is `import` followed by its URI. Returns (entry, index of the closing ';')."""
+    entry = {"uri": tokens[index + 1].value, "show": []}
+    scan = index + 2
+    showing = False
+    count = len(tokens)
+    while scan < count and scan - index < MAX_IMPORT_TOKENS and tokens[scan].value != ";":
+        current = tokens[scan]
+        if current.value in ("show", "hide"):
+            showing = current.value == "show"
+        elif showing and current.kind == IDENT:
+            entry["show"].append(current.value)
+        scan += 1
+    return entry, scan
+
+
+def _final_field(source, tokens, index):
+    """`tokens[index]` is `final` in a class body. Returns (type, name), or None if it does not declare a field."""
+    scan = index + 1
+    count = len(tokens)
+    while scan < count and scan - index < MAX_TYPE_TOKENS and tokens[scan].value not in (";", "=", "{", "(", "}"):
+        scan += 1
+    # `final Type name;` or `final Type name = value;`
+    if scan < count and tokens[scan].value in (";", "=") and scan - index >= 3 and tokens[scan - 1].kind == IDENT:
+        return _normalize(source[tokens[index + 1].start:tokens[scan - 1].start]), tokens[scan - 1].value
+    return None
+
+
+def _next_token(source, pos):
+    """The first token match at or after `pos` that is not a line comment."""
+    match = _TOKEN.match(source, pos)
+    while match.lastgroup == "line_comment":
+        match = _TOKEN.match(source, match.end())
+    return match
+
+
+def parse(source):
+    """
+    Single pass over a Dart file. Returns a dict with
+      imports:   [{"uri", "show": [names]}]
+      classes:   [class names]
+      fields:    [(class name, type, field name)] for `final` fields in class bodies
+      functions: [(name, parameters, return type)] for functions and methods
+    Anything inside comments or string literals is ignored, and signatures
+    spanning several lines are handled because the parser sees tokens, not lines.
+    """
+    if not any(marker in source for marker in _NEEDS_TOKENIZER) and _RAW_STRING.search(source) is None:
+        result = _parse_plain(source)
+        if result is not None:
+            return result
+    return _parse_tokens(source)
+
+
+def _parse_tokens(source):
+    tokens = tokenize(source)
+    parens = _match_parens(tokens)
+    count = len(tokens)
+
+    imports, classes, fields, functions = [], [], [], []
+    depth = 0
+    class_stack = []        # (class name, depth of its body)
+    pending_class = None
+
+    index = 0
+    while index < count:
+        token = tokens[index]
+        kind, value = token.kind, token.value
+
+        if kind == PUNCT:
+            if value == "{":
+                depth += 1
+                if pending_class is not None:
+                    class_stack.append((pending_class, depth))
+                    pending_class = None
+            elif value == "}":
+                if class_stack and class_stack[-1][1] == depth:
+                    class_stack.pop()
+                depth = max(0, depth - 1)
+            elif value == "(" and index > 0 and tokens[index - 1].kind == IDENT:
+                name_index = index - 1
+                name = tokens[name_index].value
+                close = parens.get(index)
+                if close is not None and name not in KEYWORDS and close + 1 < count \
+                        and tokens[close + 1].value in _BODY_STARTS:
+                    return_type = _declared_return_type(source, tokens, name_index)
+                    if return_type is not None:
+                        parameters = _normalize(source[token.end:tokens[close].start])
+                        functions.append((name, parameters, return_type))
+            elif value == ";":
+                pending_class = None
+            index += 1
+            continue
+
+        if kind == IDENT:
+            if value == "import" and depth == 0 and index + 1 < count and tokens[index + 1].kind == STRING:
+                entry, index = _import_entry(tokens, index)
+                imports.append(entry)
+                continue
+            if value == "class" and index + 1 < count and tokens[index + 1].kind == IDENT:
+                pending_class = tokens[index + 1].value
+                classes.append(pending_class)
+                index += 2
+                continue
+            if value == "final" and class_stack and class_stack[-1][1] == depth:
+                field = _final_field(source, tokens, index)
+                if field is not None:
+                    fields.append((class_stack[-1][0],) + field)
+        index += 1
+
+    return {"imports": imports, "classes": classes, "fields": fields, "functions": functions}
+
+
+def _blank(match):
+    """Same-length stand-in for a comment (spaces) or string literal (quotes around '#'s, which no search matches)."""
+    text = match.group()
+    if text[0] == "/":
+        return " " * len(text)
+    closed = len(text) > 1 and text[-1] == text[0]
+    return text[0] + "#" * (len(text) - 1 - closed) + (text[0] if closed else "")
+
+
+def _paren_table(masked):
+    """Map every closed `(` in the blanked-out text to its `)`, in one pass."""
+    closing = {}
+    stack = []
+    for match in _PARENS.finditer(masked):
+        if match.group() == "(":
+            stack.append(match.start())
+        elif stack:
+            closing[stack.pop()] = match.start()
+    return closing
+
+
+def _within(starts, ends, pos):
+    """Whether `pos` falls in one of the sorted, disjoint spans [starts[i], ends[i])."""
+    index = bisect.bisect_right(starts, pos) - 1
+    return index >= 0 and pos < ends[index]
+
+
+def _plain_tokens(masked, start, end, limit=None):
+    matches = islice(_PLAIN_TOKEN.finditer(masked, start, end), limit)
+    return [Token(match.lastgroup, match.group(), match.start(), match.end()) for match in matches]
+
+
+def _parse_plain(source):
+    """
+    parse() for files without block comments, interpolation, escapes or
+    multi-line strings, which is nearly all of them. Comments and strings
+    are blanked out in one substitution, then imports, classes, fields and
+    declarations are each found by a regex search, and only the few
+    characters around a match are tokenized, with the same rules as
+    _parse_tokens. Brace depth and the start of the current statement are
+    tracked by sweeping forward from match to match, which keeps the work
+    linear in the size of the file. Returns None, leaving the file to _parse_tokens, if return types
+    need more than WINDOW_BUDGET characters tokenized per character of source.
+    """
+    masked = _PLAIN_SKIP.sub(_blank, source)
+    length = len(masked)
+    closing = None          # _paren_table(masked), built when a nested parameter list needs it
+    imports, classes, fields, functions = [], [], [], []
+
+    matches = list(_PLAIN_CLASS.finditer(masked))
+    # A class name is never also read as a keyword
+    names = {match.start(1) for match in matches}
+
+    # Import statements, inside which nothing else is looked for
+    span_starts, span_ends = [], []
+    depth = counted = 0     # brace depth at `counted`
+    semicolon = -1          # first ';' after the last import looked at
+    for match in _PLAIN_IMPORT.finditer(masked):
+        start = match.start()
+        if start in names or _within(span_starts, span_ends, start):
+            continue
+        for brace in _BRACES.finditer(masked, counted, start):
+            depth = depth + 1 if brace.group() == "{" else max(0, depth - 1)
+        counted = start
+        if depth or _next_token(masked, match.end()).lastgroup not in ("simple_string", "string"):
+            continue
+        if semicolon < match.end():
+            semicolon = masked.find(";", match.end())
+            if semicolon < 0:
+                semicolon = length
+        tokens = _plain_tokens(masked, start, semicolon + 1, MAX_IMPORT_TOKENS + 1)
+        entry, scan = _import_entry(tokens, 0)
+        # The statement ends where _parse_tokens stops reading it; braces inside are not counted
+        end = tokens[scan].start if scan < len(tokens) else length
+        span_starts.append(start)
+        span_ends.append(end)
+        counted = end
+        # The blanked-out text only holds placeholders for string contents
+        uri = tokens[1]
+        closed = uri.end - uri.start > 1 and masked[uri.end - 1] == masked[uri.start]
+        entry["uri"] = source[uri.start + 1:uri.end - 1 if closed else uri.end]
+        imports.append(entry)
+
+    bodies = {}             # index of a class body's '{' -> class name
+    matches = [match for match in matches if not _within(span_starts, span_ends, match.start())]
+    for index, match in enumerate(matches):
+        classes.append(match.group(1))
+        following = matches[index + 1].start() if index + 1 < len(matches) else length
+        # A later `class`, or a ';' first (`class A = B with C;`), means this class has no body
+        body = masked.find("{", match.end(), following)
+        if body < 0 or masked.find(";", match.end(), body) >= 0:
+            continue
+        bodies[body] = match.group(1)
+
+    if bodies:
+        open_braces = []
+        counted = 0
+        stop_at = -1
+        for match in _PLAIN_FINAL.finditer(masked):
+            start = match.start()
+            if start in names or _within(span_starts, span_ends, start):
+                continue
+            for brace in _BRACES.finditer(masked, counted, start):
+                if brace.group() == "{":
+                    open_braces.append(brace.start())
+                elif open_braces:
+                    open_braces.pop()
+            counted = start
+            # The `final` must be directly inside a class body
+            owner = bodies.get(open_braces[-1]) if open_braces else None
+            if owner is None:
+                continue
+            if stop_at < match.end():
+                stop = _FIELD_STOP.search(masked, match.end())
+                if stop is None:
+                    break
+                stop_at = stop.start()
+            # _final_field looks at no more than MAX_TYPE_TOKENS + 1 tokens
+            tokens = _plain_tokens(masked, start, stop_at + 1, MAX_TYPE_TOKENS + 1)
+            field = _final_field(source, tokens, 0)
+            if field is not None:
+                fields.append((owner,) + field)
+
+    budget = WINDOW_BUDGET * length + MAX_WINDOW_CHARS
+    statement = -1          # last ; { or } before `searched`
+    searched = 0
+    for match in _PLAIN_CALL.finditer(masked):
+        name = match.group(1)
+        if name in KEYWORDS:
+            continue
+        name_start, name_end = match.span(1)
+        if _within(span_starts, span_ends, name_start):
+            continue
+        # Only a type (a word, `>` or `?`) can precede a declared name
+        before = name_start - 1
+        while before >= 0 and masked[before].isspace():
+            before -= 1
+        if before < 0:
+            continue
+        char = masked[before]
+        word_start = None
+        if char == ">":
+            if before > 0 and masked[before - 1] == "=":
+                continue
+        elif char != "?":
+            if char not in _IDENT_CHARS:
+                continue
+            word_start = before
+            while word_start > 0 and masked[word_start - 1] in _IDENT_CHARS:
+                word_start -= 1
+            if masked[word_start].isdigit() or masked[word_start:before + 1] in KEYWORDS:
+                continue
+        if match.group(2) is not None:
+            open_at, close = match.start(2) - 1, match.end(2)
+        else:
+            open_at = masked.find("(", name_end)
+            if closing is None:
+                closing = _paren_table(masked)
+            close = closing.get(open_at)
+            if close is None:
+                continue
+            following = _next_token(masked, close + 1)
+            if following.group(following.lastgroup) not in _BODY_STARTS:
+                continue
+        parameters = _normalize(source[open_at + 1:close])
+
+        if word_start is not None and masked[word_start:before + 1] != "set":
+            attached = word_start - 1
+            while attached >= 0 and masked[attached].isspace():
+                attached -= 1
+            # `Type name(`: a lone word is the whole return type
+            if attached < 0 or masked[attached] != ".":
+                functions.append((name, parameters, _normalize(source[word_start:name_start])))
+                continue
+
+        # Otherwise walk the tokens back to the start of the statement: a return type never spans ; { or }
+        floor = max(0, name_start - MAX_WINDOW_CHARS)
+        if searched < floor:
+            searched = floor
+        statement = max(statement, masked.rfind(";", searched, name_start), masked.rfind("{", searched, name_start),
+                        masked.rfind("}", searched, name_start))
+        searched = name_start
+        start = statement + 1 if statement >= floor else 0
+        if start == 0 and floor > 0:
+            space = _PLAIN_SPACE.search(masked, floor, name_start)
+            start = space.start() if space else floor
+        budget -= name_end - start
+        if budget < 0:
+            return None
+        tokens = _plain_tokens(masked, start, name_end)
+        if not tokens or tokens[-1].kind != IDENT or tokens[-1].value != name:
+            continue
+        return_type = _declared_return_type(source, tokens, len(tokens) - 1)
+        if return_type is not None:
+            functions.append((name, parameters, return_type))
+
+    return {"imports": imports, "classes": classes, "fields": fields, "functions": functions}
@@ -1,40 +1,38 @@
-from openai import OpenAI
+import re
+import csv
 import json
+import sys
+import time
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-# Initialize OpenAI client
-client = OpenAI()
+# Share the response cache and LLM client with scripts/project_initializer.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+from llm_cache import add_cache_arguments, cache_from_args
+from atomic_write import atomic_open
+import llm_client
 
-# User input
-user_input = "\n\nCrossword App flutter dart iOS & Android\n\n"
+# Default user input
+DEFAULT_USER_INPUT = "\n\nCrossword App flutter dart iOS & Android\n\n"
 
-# Make OpenAI API request
+SYSTEM_MESSAGES = [
+    {
+        "role": "system",
+        "content": "I am a technical writer and as such, I excel in clear, concise communication, skillfully breaking down complex technical concepts for a variety of code bases. My proficiency in research and attention to detail ensures accuracy and consistency in my work. I adeptly collect and organize complex information in an efficient manner, understanding and anticipating the needs of the app. In my role, I always prioritize optimized plans for future development."
+    },
+    {
+        "role": "system",
+        "content": "I will meticulously research and compile a 5-page report focused on the 'user_input'. I will then use the contents of my report to compile a detailed response."
+    },
+    {
+        "role": "assistant",
+        "content": "This is the first and foundational step in the process for generating a high-fidelity production app. I must therefore be precise and complete."
+    }
+]
 
-response = client.chat.completions.create(
-  model="gpt-4o-mini",
-  messages=[
-   {
-            "role": "system",
-            "content": "I am a technical writer and as such, I excel in clear, concise communication, skillfully breaking down complex technical concepts for a variety of code bases. My proficiency in research and attention to detail ensures accuracy and consistency in my work. I adeptly collect and organize complex information in an efficient manner, understanding and anticipating the needs of the app. In my role, I always prioritize optimized plans for future development."
-        },
-        {
-            "role": "system",
-            "content": "I will meticulously research and compile a 5-page report focused on the 'user_input'. I will then use the contents of my report to compile a detailed response."
-        },
-        {
-            "role": "assistant",
-            "content": "This is the first and foundational step in the process for generating a high-fidelity production app. I must therefore be precise and complete."
-        },
-        {
-            "role": "user",
-            "content": user_input
-        }
-    ],
-    temperature=1.4,
-    max_tokens=5000,
-    top_p=1,
-    frequency_penalty=0,
-    presence_penalty=0,
-    response_format={
+# Structured-output schema for the app plan
+RESPONSE_FORMAT = {
         "type": "json_schema",
         "json_schema": {
       "name": "app_plan",
@@ -551,16 +549,160 @@ response = client.chat.completions.create(
       }
     }
   }
-)
 
-# Extract the JSON response from the API output
-response_content = response.choices[0].message.content
+def get_client():
+    """The shared rate-limited client; it connects on first use so importing this module stays offline."""
+    return llm_client.shared_client()
+
+def build_request(user_input):
+    """Build the chat completion request for one app idea."""
+    return dict(
+        model="gpt-4o-mini",
+        messages=SYSTEM_MESSAGES + [{"role": "user", "content": user_input}],
+        temperature=1.4,
+        max_tokens=5000,
+        top_p=1,
+        frequency_penalty=0,
+        presence_penalty=0,
+        response_format=RESPONSE_FORMAT
+    )
+
+def generate_subject(user_input, response_cache=None, refresh=False):
+    """
+    Request (or replay from the response cache) the subject plan for
+    `user_input`. With `refresh` the cache is not read, only updated with the
+    new response. Only a response fetched from the API is stored.
+    """
+    request = build_request(user_input)
+    # Replay mode never calls the API, so it reads the cache even on a refresh
+    read_cache = response_cache and (not refresh or response_cache.replay)
+    response_content = response_cache.get(request) if read_cache else None
+    cached = response_content is not None
+    if not cached:
+        response = get_client().create(**request)
+
+        # Extract the JSON response from the API output
+        response_content = response.choices[0].message.content
+
+    # Convert the response content to a valid JSON object
+    response_json = json.loads(response_content)
+    if response_cache and not cached:
+        response_cache.put(request, response_content)
+    return response_json
+
+def slugify(text, max_length=48):
+    slug = re.sub(r'[^a-z0-9]+', '_', text.lower()).strip('_')
+    return slug[:max_length].rstrip('_') or 'project'
+
+def read_manifest(path):
+    """
+    Read app ideas from a CSV (header with an `idea` column and optional `project`
+    column) or JSONL ({"idea": ..., "project": ...} per line) manifest.
+    Returns [(project, idea)] with unique project names.
+    """
+    path = Path(path)
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if path.suffix.lower() in ('.jsonl', '.ndjson'):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+    entries = []
+    seen = set()
+    for number, row in enumerate(rows, 1):
+        idea = (row.get('idea') or '').strip()
+        if not idea:
+            print(f"Skipping manifest row {number}: no idea", file=sys.stderr)
+            continue
+        project = slugify(row.get('project') or idea)
+        name, suffix = project, 2
+        while name in seen:
+            name, suffix = f"{project}_{suffix}", suffix + 1
+        seen.add(name)
+        entries.append((name, idea))
+    return entries
+
+def write_subject(response_json, path):
+    """Write subject.json atomically so an interrupted batch never leaves a partial file."""
+    with atomic_open(path) as json_file:
+        json.dump(response_json, json_file, indent=4)
+
+def run_batch(entries, out_dir, response_cache=None, workers=8, overwrite=False):
+    """
+    Generate a subject plan per (project, idea) concurrently, writing
+    <out_dir>/<project>/alignment_files/subject.json (the layout
+    project_initializer.py takes as project directories). Projects that
+    already have a subject.json are skipped unless `overwrite` is set, so an
+    interrupted batch can simply be rerun; `overwrite` also asks the API for
+    new plans rather than replaying cached ones. Returns the per-project results.
+    """
+    out_dir = Path(out_dir)
+    pending = []
+    results = []
+    for project, idea in entries:
+        target = out_dir / project / 'alignment_files' / 'subject.json'
+        if target.is_file() and not overwrite:
+            results.append({"project": project, "status": "skipped", "seconds": 0.0})
+        else:
+            pending.append((project, idea, target))
+
+    def run_one(project, idea, target):
+        start = time.perf_counter()
+        write_subject(generate_subject(idea, response_cache, refresh=overwrite), target)
+        return time.perf_counter() - start
+
+    total = len(pending)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_one, *item): item[0] for item in pending}
+        for done, future in enumerate(as_completed(futures), 1):
+            project = futures[future]
+            try:
+                seconds = future.result()
+                results.append({"project": project, "status": "ok", "seconds": seconds})
+                print(f"[{done}/{total}] {project}: ok in {seconds:.1f}s")
+            except Exception as e:
+                results.append({"project": project, "status": "failed", "error": str(e)})
+                print(f"[{done}/{total}] {project}: failed: {e}", file=sys.stderr)
+    elapsed = time.perf_counter() - start
+
+    succeeded = sorted(result["seconds"] for result in results if result["status"] == "ok")
+    failed = sum(1 for result in results if result["status"] == "failed")
+    skipped = len(results) - len(succeeded) - failed
+    print(f"\nBatch: {len(succeeded)} ok, {failed} failed, {skipped} skipped in {elapsed:.1f}s")
+    if succeeded and elapsed > 0:
+        print(f"Throughput: {len(succeeded) / elapsed * 60:.1f} subjects/min, "
+              f"median {succeeded[len(succeeded) // 2]:.1f}s, slowest {succeeded[-1]:.1f}s per subject")
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate alignment_files/subject.json for an app idea.")
+    parser.add_argument('user_input', nargs='?', default=DEFAULT_USER_INPUT, help="App idea to plan")
+    parser.add_argument('--manifest', help="CSV or JSONL file of app ideas to plan in one batch")
+    parser.add_argument('--out-dir', default='projects',
+                        help="Batch output root; each idea gets <out-dir>/<project>/alignment_files/subject.json")
+    parser.add_argument('--workers', type=int, default=8, help="Concurrent generations in a batch")
+    parser.add_argument('--overwrite', action='store_true', help="Regenerate projects that already have a subject.json")
+    add_cache_arguments(parser)
+    llm_client.add_client_arguments(parser)
+    args = parser.parse_args(argv)
+
+    response_cache = cache_from_args(args)
+    llm_client.configure_client(args)
+    if args.manifest:
+        results = run_batch(read_manifest(args.manifest), args.out_dir, response_cache,
+                            workers=args.workers, overwrite=args.overwrite)
+        print(f"Response cache: {response_cache.stats()}")
+        if any(result["status"] == "failed" for result in results):
+            sys.exit(1)
+        return
+
+    response_json = generate_subject(args.user_input, response_cache)
+    print(f"Response cache: {response_cache.stats()}")
 
-# Convert the response content to a valid JSON object
-response_json = json.loads(response_content)
+    # Save the JSON response to a file
+    write_subject(response_json, 'alignment_files/subject.json')
 
-# Save the JSON response to a file
-with open('alignment_files/subject.json', 'w') as json_file:
-    json.dump(response_json, json_file, indent=4)
+    print("JSON response saved to subject.json")
 
-print("JSON response saved to subject.json")
+if __name__ == "__main__":
+    main()
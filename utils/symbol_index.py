@@ -0,0 +1,222 @@
+import re
+import sys
+import time
+import sqlite3
+import argparse
+
+# Lower-case Dart types that still count as types in signatures
+BUILTIN_TYPES = frozenset(("int", "double", "num", "bool", "dynamic", "void", "var", "Object"))
+
+_IDENTIFIER = re.compile(r"[A-Za-z_$][\w$]*")
+
+# Reference kinds and roles are stored as small integers to keep rows compact
+KINDS = ("class", "function", "field", "field_type", "import", "signature")
+ROLES = ("definition", "usage", "consumes", "produces")
+KIND_IDS = {kind: code for code, kind in enumerate(KINDS)}
+ROLE_IDS = {role: code for code, role in enumerate(ROLES)}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, path TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS symbols (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+-- One row per distinct (symbol, file, kind, role); role is definition or usage
+CREATE TABLE IF NOT EXISTS refs (
+    symbol_id INTEGER NOT NULL,
+    file_id INTEGER NOT NULL,
+    kind INTEGER NOT NULL,
+    role INTEGER NOT NULL
+);
+-- role is consumes (parameter type) or produces (return type)
+CREATE TABLE IF NOT EXISTS signatures (
+    type_id INTEGER NOT NULL,
+    function_id INTEGER NOT NULL,
+    file_id INTEGER NOT NULL,
+    role INTEGER NOT NULL
+);
+"""
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS refs_by_symbol ON refs (symbol_id, role);
+CREATE INDEX IF NOT EXISTS refs_by_file ON refs (file_id);
+CREATE INDEX IF NOT EXISTS signatures_by_type ON signatures (type_id, role);
+CREATE INDEX IF NOT EXISTS signatures_by_file ON signatures (file_id);
+"""
+
+
+def type_names(text):
+    """Type identifiers mentioned in a parameter list or return type (capitalized names and builtins)."""
+    return {name for name in _IDENTIFIER.findall(text) if name[0].isupper() or name in BUILTIN_TYPES}
+
+
+class SymbolIndex:
+    """
+    Cross-reference index over values_xtractor results, stored in SQLite.
+
+    Answers "where is X defined / used", "what does this file define or
+    use" and "which functions take or return type T" with indexed lookups,
+    so queries stay well under a millisecond however large the tree is.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA + INDEXES)
+        self._symbol_ids = {}
+        self._file_ids = {}
+        self._bulk = False
+
+    def clear(self):
+        """
+        Drop all indexed data before a full rebuild. Secondary indexes are
+        dropped too and recreated by close(), which is much faster than
+        maintaining them row by row during a bulk load.
+        """
+        with self.connection:
+            for name in ("refs_by_symbol", "refs_by_file", "signatures_by_type", "signatures_by_file"):
+                self.connection.execute(f"DROP INDEX IF EXISTS {name}")
+            for table in ("refs", "signatures", "files", "symbols"):
+                self.connection.execute(f"DELETE FROM {table}")
+        self.connection.execute("PRAGMA synchronous = OFF")
+        self._symbol_ids.clear()
+        self._file_ids.clear()
+        self._bulk = True
+
+    def _id(self, table, value, cache):
+        cached = cache.get(value)
+        if cached is not None:
+            return cached
+        column = "path" if table == "files" else "name"
+        row = self.connection.execute(f"SELECT id FROM {table} WHERE {column} = ?", (value,)).fetchone()
+        if row is None:
+            row = (self.connection.execute(f"INSERT INTO {table} ({column}) VALUES (?)", (value,)).lastrowid,)
+        cache[value] = row[0]
+        return row[0]
+
+    def symbol_id(self, name):
+        return self._id("symbols", name, self._symbol_ids)
+
+    def file_id(self, path):
+        return self._id("files", path, self._file_ids)
+
+    def add_file(self, path, result):
+        """
+        Index one file's extraction result (see values_xtractor.extract_values),
+        replacing anything previously indexed for that path.
+        """
+        file_id = self.file_id(path)
+        if not self._bulk:
+            self.connection.execute("DELETE FROM refs WHERE file_id = ?", (file_id,))
+            self.connection.execute("DELETE FROM signatures WHERE file_id = ?", (file_id,))
+
+        definition, usage = ROLE_IDS["definition"], ROLE_IDS["usage"]
+        refs = set()
+        for name in result.get("class_names", []):
+            refs.add((self.symbol_id(name), file_id, KIND_IDS["class"], definition))
+        for name, field_type in result.get("model_fields", {}).items():
+            refs.add((self.symbol_id(name), file_id, KIND_IDS["field"], definition))
+            for type_name in type_names(field_type):
+                refs.add((self.symbol_id(type_name), file_id, KIND_IDS["field_type"], usage))
+        for name in result["imported_packages"] + result["imported_classes"]:
+            refs.add((self.symbol_id(name), file_id, KIND_IDS["import"], usage))
+
+        signatures = set()
+        for function_name, parameters, return_type in result.get("functions", []):
+            function_id = self.symbol_id(function_name)
+            refs.add((function_id, file_id, KIND_IDS["function"], definition))
+            for role, text in (("consumes", parameters), ("produces", return_type)):
+                for type_name in type_names(text):
+                    type_id = self.symbol_id(type_name)
+                    signatures.add((type_id, function_id, file_id, ROLE_IDS[role]))
+                    refs.add((type_id, file_id, KIND_IDS["signature"], usage))
+
+        self.connection.executemany("INSERT INTO refs VALUES (?, ?, ?, ?)", refs)
+        self.connection.executemany("INSERT INTO signatures VALUES (?, ?, ?, ?)", signatures)
+
+    def commit(self):
+        self.connection.commit()
+
+    def close(self):
+        self.connection.commit()
+        if self._bulk:
+            self.connection.executescript(INDEXES)
+            self._bulk = False
+        self.connection.close()
+
+    # Queries
+
+    def _refs(self, name, role):
+        rows = self.connection.execute(
+            "SELECT files.path, refs.kind FROM refs"
+            " JOIN symbols ON symbols.id = refs.symbol_id"
+            " JOIN files ON files.id = refs.file_id"
+            " WHERE symbols.name = ? AND refs.role = ? ORDER BY files.path",
+            (name, ROLE_IDS[role])
+        ).fetchall()
+        return [(path, KINDS[kind]) for path, kind in rows]
+
+    def definitions(self, name):
+        """[(path, kind)] where `name` is declared as a class, function or field."""
+        return self._refs(name, "definition")
+
+    def usages(self, name):
+        """[(path, kind)] where `name` is imported or used in a signature or field type."""
+        return self._refs(name, "usage")
+
+    def file_symbols(self, path):
+        """[(name, kind, role)] for everything indexed in one file."""
+        rows = self.connection.execute(
+            "SELECT symbols.name, refs.kind, refs.role FROM refs"
+            " JOIN symbols ON symbols.id = refs.symbol_id"
+            " JOIN files ON files.id = refs.file_id"
+            " WHERE files.path = ? ORDER BY refs.role, refs.kind, symbols.name",
+            (path,)
+        ).fetchall()
+        return [(name, KINDS[kind], ROLES[role]) for name, kind, role in rows]
+
+    def _signatures(self, type_name, role):
+        return self.connection.execute(
+            "SELECT DISTINCT functions.name, files.path FROM signatures"
+            " JOIN symbols AS types ON types.id = signatures.type_id"
+            " JOIN symbols AS functions ON functions.id = signatures.function_id"
+            " JOIN files ON files.id = signatures.file_id"
+            " WHERE types.name = ? AND signatures.role = ? ORDER BY files.path, functions.name",
+            (type_name, ROLE_IDS[role])
+        ).fetchall()
+
+    def consumers(self, type_name):
+        """[(function, path)] for functions taking a `type_name` parameter."""
+        return self._signatures(type_name, "consumes")
+
+    def producers(self, type_name):
+        """[(function, path)] for functions whose return type mentions `type_name`."""
+        return self._signatures(type_name, "produces")
+
+
+QUERIES = {
+    "defs": SymbolIndex.definitions,
+    "uses": SymbolIndex.usages,
+    "file": SymbolIndex.file_symbols,
+    "consumers": SymbolIndex.consumers,
+    "producers": SymbolIndex.producers,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query a symbol cross-reference index written by values_xtractor --xref.")
+    parser.add_argument('database', help="SQLite index file")
+    parser.add_argument('query', choices=sorted(QUERIES), help="defs/uses NAME, file PATH, consumers/producers TYPE")
+    parser.add_argument('name', help="Symbol, type or file path to look up")
+    parser.add_argument('--time', action='store_true', help="Print the lookup latency")
+    args = parser.parse_args(argv)
+
+    index = SymbolIndex(args.database)
+    start = time.perf_counter()
+    rows = QUERIES[args.query](index, args.name)
+    elapsed = time.perf_counter() - start
+    for row in rows:
+        print("\t".join(row))
+    if args.time:
+        print(f"{len(rows)} rows in {elapsed * 1000:.3f} ms", file=sys.stderr)
+    index.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import sys
+import json
+
+# Categories stored in non_modelvalues.json, in output order
+CATEGORIES = (
+    "event_names",
+    "state_names",
+    "function_names",
+    "inputs_outputs",
+    "imported_packages",
+    "imported_classes",
+)
+
+
+class SymbolTable:
+    """
+    Interned, deduplicated symbols per category.
+
+    Every unique name is stored once per category together with its
+    occurrence count and the ids of the files it occurs in. File ids index
+    into `files`, so a symbol seen in a thousand places costs a thousand
+    small ints instead of a thousand copies of the name. Lookups by name are
+    plain dict hits.
+    """
+
+    def __init__(self):
+        self.files = []
+        self._file_ids = {}
+        self.symbols = {category: {} for category in CATEGORIES}
+
+    def file_id(self, file_key):
+        file_id = self._file_ids.get(file_key)
+        if file_id is None:
+            file_id = len(self.files)
+            self._file_ids[file_key] = file_id
+            self.files.append(file_key)
+        return file_id
+
+    def add(self, category, name, file_id):
+        table = self.symbols[category]
+        entry = table.get(name)
+        if entry is None:
+            entry = table[sys.intern(name)] = {"count": 0, "files": []}
+        entry["count"] += 1
+        # Files are merged one at a time, so a repeat within a file is always the last id
+        if not entry["files"] or entry["files"][-1] != file_id:
+            entry["files"].append(file_id)
+        return entry
+
+    def add_file(self, file_key, result):
+        """Fold one file's extraction result (see values_xtractor.extract_values) into the table."""
+        file_id = self.file_id(file_key)
+        for name in result["imported_packages"]:
+            self.add("imported_packages", name, file_id)
+        for name in result["imported_classes"]:
+            self.add("imported_classes", name, file_id)
+        if "model_fields" in result:
+            return
+        for name in result["event_names"]:
+            self.add("event_names", name, file_id)
+        for name in result["state_names"]:
+            self.add("state_names", name, file_id)
+        for function_name, parameters, return_type in result["functions"]:
+            self.add("function_names", function_name, file_id)
+            entry = self.add("inputs_outputs", function_name, file_id)
+            signatures = entry.setdefault("parameters", [])
+            if parameters not in signatures:
+                signatures.append(parameters)
+            return_types = entry.setdefault("return_types", [])
+            if return_type not in return_types:
+                return_types.append(return_type)
+
+    def lookup(self, category, name):
+        """Return {"count", "files": [paths], ...} for a symbol, or None."""
+        entry = self.symbols[category].get(name)
+        if entry is None:
+            return None
+        found = dict(entry)
+        found["files"] = [self.files[file_id] for file_id in entry["files"]]
+        return found
+
+    def clear(self):
+        self.files.clear()
+        self._file_ids.clear()
+        for table in self.symbols.values():
+            table.clear()
+
+    def to_json(self):
+        data = {"files": self.files}
+        data.update(self.symbols)
+        return data
+
+    @classmethod
+    def from_json(cls, data):
+        table = cls()
+        for file_key in data.get("files", []):
+            table.file_id(file_key)
+        for category in CATEGORIES:
+            table.symbols[category] = {sys.intern(name): entry for name, entry in data.get(category, {}).items()}
+        return table
+
+
+def load_symbol_table(path):
+    with open(path, 'r') as f:
+        return SymbolTable.from_json(json.load(f))
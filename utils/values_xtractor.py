@@ -1,12 +1,26 @@
 import os
+import sys
 import json
-import re
+import time
+import hashlib
+import argparse
 from pathlib import Path
+from itertools import islice
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# Share the atomic file writer with scripts/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+from atomic_write import atomic_open
+from symbol_table import SymbolTable
+from symbol_index import SymbolIndex
+import dart_lexer
 
 # Define the paths
 base_path = Path("lib")
 model_values_path = Path("model_values.json")
 non_model_values_path = Path("non_modelvalues.json")
+index_path = Path(".values_xtractor_index.json")
 
 # Initialize dictionaries to store values
 model_values = {}
@@ -19,58 +33,444 @@ non_model_values = {
     "imported_classes": []
 }
 
-# Function to scan Dart files
-def scan_dart_files():
-    for file_path in base_path.rglob("*.dart"):
-        with open(file_path, 'r') as file:
-            content = file.read()
-            parse_content(content, file_path.name)
+# "symbols" writes non_modelvalues.json as an interned symbol table with
+# counts and file ids; "lists" keeps the original one-entry-per-occurrence lists
+output_format = "symbols"
+symbol_table = SymbolTable()
+
+# Below this many files a process pool costs more than it saves
+MIN_FILES_PER_JOB = 8
+# Files per task sent to a worker; caps how many results one window holds
+MAX_BATCH_FILES = 16
+
+# Cached per-file results are only valid for the extractor that produced them;
+# bump RESULT_VERSION when the shape of extract_values() output changes
+RESULT_VERSION = 2
+EXTRACTOR_VERSION = f"dart_lexer-{dart_lexer.VERSION}.{RESULT_VERSION}"
+
+
+# Function to extract values from Dart content in a single pass
+def extract_values(content, file_name):
+    """
+    Return the values found in one Dart file as a plain dict, without touching
+    the module-level aggregates. Safe to call in worker processes.
+    """
+    parsed = dart_lexer.parse(content)
+    result = {
+        "imported_packages": [entry["uri"] for entry in parsed["imports"]],
+        "imported_classes": [name for entry in parsed["imports"] for name in entry["show"]],
+        # Kept for every file so the cross-reference index sees all definitions
+        "class_names": parsed["classes"],
+        "functions": parsed["functions"],
+    }
+    if "model" in file_name.lower():
+        result["model_fields"] = {name: field_type for _, field_type, name in parsed["fields"]}
+        return result
+    result["event_names"] = [name for name in parsed["classes"] if name.endswith("Event") and name != "Event"]
+    result["state_names"] = [name for name in parsed["classes"] if name.endswith("State") and name != "State"]
+    return result
+
+
+# Function to clear the module-level aggregates before a fresh merge
+def reset_values():
+    model_values.clear()
+    for values in non_model_values.values():
+        values.clear()
+    symbol_table.clear()
+
+
+# Function to fold one file's values into the module-level aggregates
+def merge_values(result, file_name, file_key=None):
+    """
+    `file_key` identifies the file in the symbol table (its path); it
+    defaults to the bare file name.
+    """
+    if output_format == "symbols":
+        if "model_fields" in result:
+            model_values[file_name] = result["model_fields"]
+        symbol_table.add_file(file_key or file_name, result)
+        return
+    non_model_values["imported_packages"].extend(result["imported_packages"])
+    non_model_values["imported_classes"].extend(result["imported_classes"])
+    if "model_fields" in result:
+        model_values[file_name] = result["model_fields"]
+        return
+    non_model_values["event_names"].extend(result["event_names"])
+    non_model_values["state_names"].extend(result["state_names"])
+    for function_name, parameters, return_type in result["functions"]:
+        non_model_values["function_names"].append(function_name)
+        non_model_values["inputs_outputs"].append({
+            "function_name": function_name,
+            "parameters": parameters,
+            "return_type": return_type
+        })
+
 
 # Function to parse Dart content
 def parse_content(content, file_name):
-    # Extract imported packages and classes
-    imported_packages = re.findall(r"import '([^']+)';", content)
-    imported_classes = re.findall(r'import package:([^"]+)";', content)
-    non_model_values["imported_packages"].extend(imported_packages)
-    non_model_values["imported_classes"].extend(imported_classes)
-    
-    # Extract class names
-    class_name = re.findall(r'class (\w+)', content)
-    
-    if "model" in file_name.lower():
-        # Extract model fields
-        fields = re.findall(r'final (\w+) (\w+);', content)
-        model_values[file_name] = {field[1]: field[0] for field in fields}
-    else:
-        # Extract event and state names
-        event_names = re.findall(r'class (\w+Event)', content)
-        state_names = re.findall(r'class (\w+State)', content)
-        non_model_values["event_names"].extend(event_names)
-        non_model_values["state_names"].extend(state_names)
-
-        # Extract function names and their inputs/outputs
-        functions = re.findall(r'\w+ (\w+)\((.*)\)', content)
-        for function in functions:
-            non_model_values["function_names"].append(function[0])
-            non_model_values["inputs_outputs"].append({
-                "function_name": function[0],
-                "parameters": function[1]
-            })
+    merge_values(extract_values(content, file_name), file_name)
+
+
+# Function to read and extract a single Dart file (runs in worker processes)
+def scan_file(file_path):
+    """
+    Return the file's values, or None if it was deleted after being listed or
+    cannot be read as UTF-8 text (reported and skipped).
+    """
+    try:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            content = file.read()
+    except FileNotFoundError:
+        return None
+    except (UnicodeDecodeError, OSError) as e:
+        print(f"Skipping {file_path}: {e}", file=sys.stderr)
+        return None
+    return extract_values(content, Path(file_path).name)
+
+
+# Function to scan a batch of files in one worker round trip
+def scan_files(file_paths):
+    return [scan_file(file_path) for file_path in file_paths]
+
+
+# Function to extract many files lazily, in a process pool when there are enough of them
+def iter_extract(file_paths, jobs=None):
+    """
+    Yield scan_file() for each path, in order. With a pool, at most jobs * 2
+    batches are in flight: the next batch is submitted only as the oldest is
+    yielded, so results are neither all queued up front nor buffered out of
+    order beyond that window.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    jobs = min(jobs, max(1, len(file_paths) // MIN_FILES_PER_JOB))
+    if jobs <= 1:
+        for file_path in file_paths:
+            yield scan_file(file_path)
+        return
+    batch_size = max(1, min(MAX_BATCH_FILES, len(file_paths) // (jobs * 4)))
+    batches = (file_paths[start:start + batch_size] for start in range(0, len(file_paths), batch_size))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending = deque()
+        for batch in islice(batches, jobs * 2):
+            pending.append(pool.submit(scan_files, batch))
+        while pending:
+            results = pending.popleft().result()
+            for batch in islice(batches, 1):
+                pending.append(pool.submit(scan_files, batch))
+            yield from results
+
+
+# Function to load the persistent per-file index
+def load_index(path=None):
+    """
+    Return the saved file index, or an empty one if it is missing, unreadable
+    or was written by a different extractor version.
+    """
+    path = Path(path or index_path)
+    try:
+        with open(path, 'r') as index_file:
+            index = json.load(index_file)
+    except (OSError, json.JSONDecodeError):
+        return {"version": EXTRACTOR_VERSION, "files": {}}
+    if index.get("version") != EXTRACTOR_VERSION:
+        print(f"Ignoring {path}: written by a different extractor version")
+        return {"version": EXTRACTOR_VERSION, "files": {}}
+    return index
+
+
+# Function to save the index atomically
+def save_index(index, path=None):
+    with atomic_open(path or index_path) as index_file:
+        json.dump(index, index_file, separators=(',', ':'))
+
+
+def _file_digest(file_path):
+    with open(file_path, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+# Function to yield per-file results for the Dart tree
+def iter_scan(jobs=None, index=None, stats=None):
+    """
+    Yield (file_path, result) for every lib/**/*.dart file in discovery order.
+    Files are spread across `jobs` worker processes (default: one per CPU).
+    Results are produced lazily, so a consumer that does not keep them only
+    ever holds a handful of files' worth of values.
+
+    With an `index` (see load_index), a file is only re-parsed when its
+    mtime/size changed and its content hash no longer matches; entries for
+    deleted files are dropped. The index is updated in place, and an entry
+    is only written once its file's result exists. Counts are
+    written into `stats` if given. A file deleted while the scan is running,
+    or one that is not valid UTF-8, is skipped as if it had never been listed.
+    """
+    file_paths = list(base_path.rglob("*.dart"))
+    if stats is None:
+        stats = {}
+    stats.update({"files": len(file_paths), "parsed": 0, "reused": 0, "removed": 0})
+
+    if index is None:
+        for file_path, result in zip(file_paths, iter_extract(file_paths, jobs)):
+            if result is None:
+                stats["files"] -= 1
+                continue
+            stats["parsed"] += 1
+            yield file_path, result
+        return
+
+    entries = index.setdefault("files", {})
+    reused = {}
+    stale = {}              # position -> index entry to store once the file is parsed
+    gone = set()
+    for position, file_path in enumerate(file_paths):
+        key = file_path.as_posix()
+        entry = entries.get(key)
+        if entry and entry.get("result") is None:
+            entry = None    # Never finished (an interrupted scan): parse again
+        try:
+            st = file_path.stat()
+            if entry and entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size:
+                reused[position] = entry["result"]
+                continue
+            digest = _file_digest(file_path)
+        except FileNotFoundError:
+            gone.add(position)  # Deleted between listing and stat
+            continue
+        if entry and entry["sha256"] == digest:
+            # Touched but unchanged (checkout, copy): refresh the stat key only
+            entry["mtime_ns"], entry["size"] = st.st_mtime_ns, st.st_size
+            reused[position] = entry["result"]
+            continue
+        stale[position] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": digest}
+
+    live = {file_path.as_posix() for position, file_path in enumerate(file_paths) if position not in gone}
+    for key in [key for key in entries if key not in live]:
+        del entries[key]
+        stats["removed"] += 1
+    stats["files"] -= len(gone)
+    stats["reused"] = len(reused)
+
+    fresh = iter_extract([file_paths[position] for position in stale], jobs)
+    for position, file_path in enumerate(file_paths):
+        if position in gone:
+            continue
+        if position in stale:
+            result = next(fresh)
+            if result is None:
+                # Deleted after its stat, or not readable as UTF-8
+                if entries.pop(file_path.as_posix(), None) is not None:
+                    stats["removed"] += 1
+                stats["files"] -= 1
+                continue
+            entries[file_path.as_posix()] = dict(stale[position], result=result)
+            stats["parsed"] += 1
+        else:
+            result = reused[position]
+        yield file_path, result
+
+
+# Function to scan Dart files
+def scan_dart_files(jobs=None, index=None, xref=None):
+    """
+    Scan the Dart tree (see iter_scan) and merge every file into the
+    module-level aggregates. With `xref` (a SymbolIndex), each file is also
+    added to the cross-reference index as it is merged.
+    """
+    stats = {}
+    for file_path, result in iter_scan(jobs=jobs, index=index, stats=stats):
+        merge_values(result, file_path.name, file_path.as_posix())
+        if xref is not None:
+            xref.add_file(file_path.as_posix(), result)
+    return stats
+
+
+# Function to stream one NDJSON record per file instead of building the aggregates
+def stream_ndjson(output, jobs=None):
+    """
+    Write {"file", "name", <extracted values>} per Dart file to `output` as
+    soon as it is extracted. Memory stays bounded by the window of files in
+    flight (see iter_extract) rather than the whole tree; use
+    merge_ndjson() to turn the stream into the aggregate JSON files. The
+    index is not used: it keeps every file's result, which is exactly the
+    memory this mode exists to avoid.
+    """
+    stats = {}
+    interactive = output is sys.stdout
+    for file_path, result in iter_scan(jobs=jobs, stats=stats):
+        record = {"file": file_path.as_posix(), "name": file_path.name}
+        record.update(result)
+        output.write(json.dumps(record, separators=(',', ':')) + "\n")
+        if interactive:
+            output.flush()
+    return stats
+
+
+# Function to rebuild the aggregates from an NDJSON stream
+def merge_ndjson(input_file):
+    reset_values()
+    records = 0
+    for line in input_file:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        merge_values(record, record["name"], record["file"])
+        records += 1
+    return records
+
+
+def _write_json_atomic(data, path, indent=4):
+    """Write to a sibling temp file and rename, so readers never see a partial file."""
+    with atomic_open(path) as tmp_file:
+        if indent is None:
+            json.dump(data, tmp_file, separators=(',', ':'))
+        else:
+            json.dump(data, tmp_file, indent=indent)
+
 
 # Function to write JSON files
 def write_json_files():
-    with open(model_values_path, 'w') as model_file:
-        json.dump(model_values, model_file, indent=4)
-    
-    with open(non_model_values_path, 'w') as non_model_file:
-        json.dump(non_model_values, non_model_file, indent=4)
-    
+    _write_json_atomic(model_values, model_values_path)
+    if output_format == "symbols":
+        # File-id lists would put every int on its own line if indented
+        _write_json_atomic(symbol_table.to_json(), non_model_values_path, indent=None)
+    else:
+        _write_json_atomic(non_model_values, non_model_values_path)
+
     print(f"Model values saved to {model_values_path}")
     print(f"Non-model values saved to {non_model_values_path}")
 
+
+# Function to take a cheap stat snapshot of the Dart tree
+def snapshot_tree():
+    snapshot = {}
+    for file_path in base_path.rglob("*.dart"):
+        try:
+            st = file_path.stat()
+        except FileNotFoundError:
+            continue  # Deleted between listing and stat
+        snapshot[file_path.as_posix()] = (st.st_mtime_ns, st.st_size)
+    return snapshot
+
+
+# Function to keep the outputs in sync with lib/ until interrupted
+def watch(jobs=None, index=None, index_file=None, interval=0.25, debounce=0.15):
+    """
+    Poll lib/ every `interval` seconds. A burst of saves is coalesced by
+    waiting until the tree has been stable for `debounce` seconds, then only
+    the touched files are re-parsed (via the index) and both output files are
+    rewritten atomically. The index is saved to `index_file` after each
+    refresh, or kept in memory only when it is None. A refresh that fails is
+    reported, the index is rolled back to its last good state and watching
+    continues.
+    """
+    if index is None:
+        index = {"version": EXTRACTOR_VERSION, "files": {}}
+
+    def refresh(reason):
+        start = time.perf_counter()
+        # Changed entries are replaced, not edited, so a shallow copy is enough to roll back
+        good = dict(index.get("files", {}))
+        try:
+            reset_values()
+            stats = scan_dart_files(jobs=jobs, index=index)
+            write_json_files()
+            print(f"{reason}: {stats['parsed']} parsed, {stats['removed']} removed "
+                  f"in {time.perf_counter() - start:.3f}s")
+            # Persisting the index is off the save -> JSON latency path
+            if index_file is not None:
+                save_index(index, index_file)
+        except Exception as e:
+            index["files"] = good
+            print(f"{reason}: refresh failed: {e}", file=sys.stderr)
+
+    previous = snapshot_tree()
+    refresh("Initial scan")
+    print(f"Watching {base_path} for changes (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(interval)
+            current = snapshot_tree()
+            if current == previous:
+                continue
+            # Debounce: wait for the burst of writes to settle
+            while True:
+                time.sleep(debounce)
+                latest = snapshot_tree()
+                if latest == current:
+                    break
+                current = latest
+            changed = sum(1 for key in current.keys() | previous.keys() if current.get(key) != previous.get(key))
+            refresh(f"{changed} file(s) changed")
+            previous = current
+    except KeyboardInterrupt:
+        print("Stopped watching")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Extract model and non-model values from lib/**/*.dart.")
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                        help="Worker processes for scanning (default: number of CPUs; 1 disables the pool)")
+    parser.add_argument('--index', default=str(index_path),
+                        help="Per-file index used to skip unchanged files on reruns")
+    parser.add_argument('--no-index', action='store_true',
+                        help="Re-parse every file and do not read or write the index")
+    parser.add_argument('--format', choices=("symbols", "lists"), default="symbols",
+                        help="non_modelvalues.json layout: interned symbol table (default) or the original occurrence lists")
+    parser.add_argument('--ndjson', metavar='PATH',
+                        help="Stream one JSON record per file to PATH ('-' for stdout) instead of writing the aggregate files; "
+                             "memory stays bounded, so every file is parsed and the index is not used")
+    parser.add_argument('--merge-ndjson', metavar='PATH',
+                        help="Build model_values.json and non_modelvalues.json from a stream written by --ndjson")
+    parser.add_argument('--xref', metavar='PATH',
+                        help="Also rebuild a SQLite symbol cross-reference index at PATH (query it with symbol_index.py)")
+    parser.add_argument('--watch', action='store_true',
+                        help="Keep running and refresh the outputs whenever lib/ changes")
+    parser.add_argument('--interval', type=float, default=0.25,
+                        help="Seconds between polls in --watch mode")
+    parser.add_argument('--debounce', type=float, default=0.15,
+                        help="Seconds the tree must be quiet before a refresh in --watch mode")
+    return parser.parse_args(argv)
+
+
 # Main function to execute the script
-def main():
-    scan_dart_files()
+def main(argv=None):
+    global output_format
+    args = parse_args(argv)
+    output_format = args.format
+    if args.merge_ndjson:
+        with open(args.merge_ndjson, 'r') as input_file:
+            records = merge_ndjson(input_file)
+        print(f"Merged {records} records from {args.merge_ndjson}")
+        write_json_files()
+        return
+
+    if args.ndjson:
+        if args.ndjson == '-':
+            stats = stream_ndjson(sys.stdout, jobs=args.jobs)
+        else:
+            with open(args.ndjson, 'w') as output:
+                stats = stream_ndjson(output, jobs=args.jobs)
+        print(f"Streamed {stats['files']} files", file=sys.stderr)
+        return
+
+    index = None if args.no_index else load_index(args.index)
+
+    if args.watch:
+        # Watch mode always keeps an index; it is what makes refreshes incremental
+        watch(jobs=args.jobs, index=index, index_file=None if args.no_index else args.index,
+              interval=args.interval, debounce=args.debounce)
+        return
+    xref = None
+    if args.xref:
+        xref = SymbolIndex(args.xref)
+        xref.clear()
+    stats = scan_dart_files(jobs=args.jobs, index=index, xref=xref)
+    if xref is not None:
+        xref.close()
+        print(f"Cross-reference index saved to {args.xref}")
+    if index is not None:
+        save_index(index, args.index)
+    print(f"Scanned {stats['files']} files: {stats['parsed']} parsed, {stats['reused']} reused, {stats['removed']} removed")
     write_json_files()
 
 if __name__ == "__main__":